@@ -1,3 +1,5 @@
-from dlafs.autograd import Value
+from dlafs.autograd import Value, Tape, no_grad
 from dlafs.array import ValueArray
+from dlafs.tensor import Tensor
+from dlafs.dual import Dual, jvp
 from dlafs import (loss, helpers, train)
@@ -1,177 +1,397 @@
+import math
+import operator
 import random
 from collections.abc import Iterable, Sequence
 from typing import Generator
 
+import numpy as np
+
 from dlafs.autograd import Value
-from dlafs.helpers import (
-    np_array_to_list_of_values,
-    list_of_values_to_np_array
-)
+from dlafs.helpers import np_array_to_list_of_values
 from dlafs._utils import format_float_string
 
 
 class ValueArray(Sequence):
     """A class for representing a multidimensional array of Value() objects.
 
-    Only indexing methods are implemented, so the class is not important to
-    understand.
+    The Values are stored in one flat list, in row-major order, and indexed through the
+    shape and strides of the Array as in numpy. Reshaping and transposing only create a new
+    view of the same list, as do slicing and iterating over the rows, so setting an item of a
+    view also sets it in the original Array. Indexing with a list of ints copies the items.
     """
 
-    def __new__(cls, data, label=''):
+    def __new__(cls, data, label='', requires_grad=True):
         if isinstance(data, ValueArray):
             instance = data
             if label:
                 instance.label = label
-                instance.values = _create_array_from_data(instance.values, label)
+                instance._set_storage(*_create_storage(instance.values, label))
             return instance
         else:
             return super().__new__(cls)
 
-    def __init__(self, data, label=''):
-        """Initialize the Array with the given data"""
+    def __init__(self, data, label='', requires_grad=True):
+        """Initialize the Array with the given data.
+
+        `requires_grad` applies to the Values created from numbers in data, existing
+        Values are kept as they are.
+        """
         if isinstance(data, ValueArray):
             return
 
-        self.values = _create_array_from_data(data, label)
-        self.shape = tuple(_get_shape_from_data(self.values))
+        self._set_storage(*_create_storage(data, label, requires_grad))
         self.label = label
 
+    def _set_storage(self, storage, shape, strides=None, offset=0):
+        self._storage = storage
+        self.shape = tuple(shape)
+        self._strides = _contiguous_strides(shape) if strides is None else tuple(strides)
+        self._offset = offset
+
+    @classmethod
+    def _view(cls, storage, shape, strides=None, offset=0, label=''):
+        """Create an Array over the given storage, without copying or checking it"""
+        array = super().__new__(cls)
+        array._set_storage(storage, shape, strides, offset)
+        array.label = label
+        return array
+
     @classmethod
-    def zeros(cls, shape, label=''):
+    def zeros(cls, shape, label='', requires_grad=True):
         """Create Array of zeros"""
         data = _create_zeros_data(shape)
-        return cls(data, label)
+        return cls(data, label, requires_grad)
 
     @classmethod
-    def random_normal(cls, shape, label='', mean=0, std=1):
+    def random_normal(cls, shape, label='', mean=0, std=1, requires_grad=True):
         """Create Array of random values from a normal dist with mean 0 and std 1"""
         data = _create_random_normal_data(shape, mean, std)
-        return cls(data, label)
+        return cls(data, label, requires_grad)
 
     @classmethod
-    def random_uniform(cls, shape, label='', low=0, high=1):
+    def random_uniform(cls, shape, label='', low=0, high=1, requires_grad=True):
         """Create Array of random values from a uniform dist between low and high"""
         data = _create_random_uniform_data(shape, low, high)
-        return cls(data, label)
+        return cls(data, label, requires_grad)
 
     @classmethod
-    def from_numpy(cls, data, label=''):
+    def from_numpy(cls, data, label='', requires_grad=True):
         """Create an Array from a numpy array"""
         data = np_array_to_list_of_values(data)
-        return cls(data, label)
+        array = cls(data, label)
+        array.requires_grad = requires_grad
+        return array
 
     def to_numpy(self):
         """Convert the Array to a numpy array"""
-        return list_of_values_to_np_array(self.values)
+        return np.array([v.data for v in self._elements()]).reshape(self.shape)
 
     def to_list(self):
         """Convert the Array to a nested list"""
         return self.to_numpy().tolist()
 
+    @property
+    def values(self):
+        """Return the Values as a nested list with the shape of the Array"""
+        return _nest(self._elements(), self.shape)
+
     def item(self):
         """Return the value of the Array as a Value scalar"""
         if max(self.shape) == 1:
-            item = self.values
-            for _ in range(self.dim):
-                item = item[0]
-            return item
+            return self._storage[self._offset]
         else:
             raise ValueError("Can't convert Array to a scalar.")
 
     def __len__(self):
         """Return the length of the Array"""
-        return len(self.values)
+        return self.shape[0]
+
+    @property
+    def requires_grad(self):
+        """Return whether any Value in the Array requires grad"""
+        return any(value.requires_grad for value in self._elements())
+
+    @requires_grad.setter
+    def requires_grad(self, requires_grad):
+        """Set whether all Values in the Array require grad"""
+        for value in self._elements():
+            value.requires_grad = requires_grad
 
     @property
     def dim(self):
         """Return the number of dimensions of the Array"""
         return len(self.shape)
 
+    @property
+    def size(self):
+        """Return the number of Values in the Array"""
+        return math.prod(self.shape)
+
     def __contains__(self, item):
         """Return whether the Array contains the given item"""
-        return self._recursive_contains(self.values, item)
-
-    def _recursive_contains(self, data, item):
-        if isinstance(data, Value):
-            if isinstance(item, Value):
-                return data == item
-            else:
-                return data.data == item
-        else:
-            return any(self._recursive_contains(subdata, item) for subdata in data)
+        if isinstance(item, Value):
+            return any(value == item for value in self._elements())
+        return any(value.data == item for value in self._elements())
 
     def __getitem__(self, index):
         """Get an item from the Array using the given index"""
         if not isinstance(index, tuple):
-            index = (index,)
-        item = self._recursive_getitem(self.values, index)
-        if isinstance(item, list):  # Convert the list to an Array
-            return ValueArray(item)
-        return item
-
-    def _recursive_getitem(self, data, indices):
-        current_idx, *remaining_idx = indices
-        if isinstance(current_idx, slice):
-            current_idx = _convert_slice_to_range(current_idx, data)
-
-        is_last_dim = not remaining_idx
-        if is_last_dim:
-            if isinstance(current_idx, Sequence):
-                return [data[idx] for idx in current_idx]
-            else:
-                return data[current_idx]
-        elif isinstance(current_idx, Sequence):
-            return [self._recursive_getitem(data[idx], remaining_idx) for idx in current_idx]
-        elif isinstance(current_idx, int):
-            return self._recursive_getitem(data[current_idx], remaining_idx)
+            index = (index, )
+        if len(index) == len(self.shape) and all(type(i) is int for i in index):
+            position = self._offset  # Fast path for a single Value
+            for i, size, stride in zip(index, self.shape, self._strides):
+                position += (i if 0 <= i < size else _normalize_index(i, size)) * stride
+            return self._storage[position]
+        if all(isinstance(i, (int, slice)) for i in index):
+            return self._slice(index)
+        positions, shape = self._select(index)
+        if not shape:
+            return self._storage[positions[0]]
+        return ValueArray._view([self._storage[p] for p in positions], shape)
+
+    def __iter__(self):
+        """Iterate over the first dimension, the rows are views of the same storage"""
+        if self.dim == 1:
+            return iter(self._elements())
+        shape, strides, row_stride = self.shape[1:], self._strides[1:], self._strides[0]
+        return (ValueArray._view(self._storage, shape, strides, self._offset + i * row_stride)
+                for i in range(self.shape[0]))
 
     def __setitem__(self, index, value):
         """Set an item in the Array using the given index"""
+        positions, shape = self._select(index)
+        if isinstance(value, ValueArray) or _is_sequence(value):
+            values, value_shape = _create_storage(value)
+            if value_shape != shape:
+                raise ValueError(f"Shape mismatch: Trying to set data of shape {value_shape} "
+                                 f"on index of shape {shape}")
+        else:
+            if len(positions) != 1:
+                raise ValueError(f"Shape mismatch: Trying to set a single number on index "
+                                 f"of shape {shape}")
+            values = [Value(value)]
+
+        for position, v in zip(positions, values):
+            self._storage[position] = v
+
+    def _slice(self, index):
+        """Return a view of the items selected by an index of ints and slices, or the Value
+        if every dimension is indexed by an int"""
+        if len(index) > self.dim:
+            raise IndexError(f"Too many indices for an Array of {self.dim} dimensions")
+        offset = self._offset
+        shape, strides = [], []
+        for i, (size, stride) in enumerate(zip(self.shape, self._strides)):
+            idx = index[i] if i < len(index) else slice(None)
+            if isinstance(idx, slice):
+                start, stop, step = idx.indices(size)
+                offset += start * stride
+                shape.append(len(range(start, stop, step)))
+                strides.append(stride * step)
+            else:
+                offset += _normalize_index(idx, size) * stride
+        if not shape:
+            return self._storage[offset]
+        return ValueArray._view(self._storage, shape, strides, offset)
+
+    def _select(self, index):
+        """Return the storage positions and shape of the items selected by an index.
+
+        Each dimension is indexed by an int, a slice or a sequence of ints, and the
+        dimensions without an index are kept whole.
+        """
         if not isinstance(index, tuple):
             index = (index,)
-        for _ in range(self.dim - len(index)):
-            index = index + (slice(None),)
-
-        data = self._recursive_setitem(self.values, index, value)
-        new_shape = tuple(_get_shape_from_data(data))
-        if new_shape != self.shape:
-            raise ValueError("Can't reshape data using setitem.")
-
-        self.values = data
-
-    def _recursive_setitem(self, data, indices, value):
-        current_idx, *remaining_idx = indices
-        if isinstance(current_idx, slice):
-            current_idx = _convert_slice_to_range(current_idx, data)
-
-        is_last_dim = not remaining_idx
-        if is_last_dim:
-            _verify_integrity(current_idx, value)
-            if isinstance(current_idx, Sequence):
-                for idx, val in zip(current_idx, value):
-                    data[idx] = Value(val)
+        if len(index) > self.dim:
+            raise IndexError(f"Too many indices for an Array of {self.dim} dimensions")
+
+        positions = [self._offset]
+        shape = []
+        for i, (size, stride) in enumerate(zip(self.shape, self._strides)):
+            idx = index[i] if i < len(index) else slice(None)
+            if isinstance(idx, slice):
+                idx = range(*idx.indices(size))
+                shape.append(len(idx))
+            elif isinstance(idx, Sequence):
+                idx = [_normalize_index(j, size) for j in idx]
+                shape.append(len(idx))
             else:
-                data[current_idx] = Value(value)
-        elif isinstance(current_idx, Sequence):
-            _verify_integrity(current_idx, value)
-            for idx, val in zip(current_idx, value):
-                data[idx] = self._recursive_setitem(data[idx], remaining_idx, val)
-        elif isinstance(current_idx, int):
-            data[current_idx] = self._recursive_setitem(
-                data[current_idx], remaining_idx, value
-            )
-        return data
+                idx = (_normalize_index(idx, size), )
+            positions = [p + j * stride for p in positions for j in idx]
+        return positions, tuple(shape)
+
+    def _elements(self):
+        """Return the Values of the Array as a flat list in row-major order"""
+        if self._strides == _contiguous_strides(self.shape):
+            return self._storage[self._offset:self._offset + self.size]
+        positions = [self._offset]
+        for size, stride in zip(self.shape, self._strides):
+            positions = [p + i * stride for p in positions for i in range(size)]
+        return [self._storage[p] for p in positions]
+
+    def reshape(self, *shape):
+        """Return the Array with a new shape, one dimension can be -1 to be inferred.
+
+        The result is a view of the same storage, unless the Array is itself a view whose
+        items aren't in row-major order (e.g. a transpose), which has to be copied first.
+        """
+        if len(shape) == 1 and isinstance(shape[0], (tuple, list)):
+            shape = shape[0]
+        shape = list(shape)
+        if shape.count(-1) > 1:
+            raise ValueError("Can only infer one dimension of the new shape")
+        if -1 in shape:
+            known = math.prod(size for size in shape if size != -1)
+            shape[shape.index(-1)] = self.size // known if known else 0
+        if math.prod(shape) != self.size:
+            raise ValueError(f"Can't reshape an Array of shape {self.shape} to {tuple(shape)}")
+
+        if self._strides == _contiguous_strides(self.shape):
+            return ValueArray._view(self._storage, shape, offset=self._offset)
+        return ValueArray._view(self._elements(), shape)
+
+    def transpose(self, *axes):
+        """Return a view with the dimensions permuted, by default in reverse order"""
+        if len(axes) == 1 and isinstance(axes[0], (tuple, list)):
+            axes = axes[0]
+        axes = tuple(axes) or tuple(reversed(range(self.dim)))
+        if sorted(axes) != list(range(self.dim)):
+            raise ValueError(f"axes {axes} don't match an Array of {self.dim} dimensions")
+        return ValueArray._view(self._storage, [self.shape[axis] for axis in axes],
+                                [self._strides[axis] for axis in axes], self._offset)
+
+    @property
+    def T(self):
+        """Return a view with the dimensions reversed"""
+        return self.transpose()
+
+    def flatten(self):
+        """Return the Array as one dimension, a view of the same storage where possible"""
+        return self.reshape(-1)
+
+    def _broadcast_to(self, shape):
+        """Return a view with the given shape, repeating the dimensions of size 1 (and the
+        missing leading ones) with a stride of 0"""
+        extra = len(shape) - self.dim
+        strides = [0] * extra + [stride if size == target else 0 for size, stride, target
+                                 in zip(self.shape, self._strides, shape[extra:])]
+        return ValueArray._view(self._storage, shape, strides, self._offset)
+
+    def _map(self, function):
+        """Return an Array of the same shape with function applied to each Value"""
+        return ValueArray._view([function(v) for v in self._elements()], self.shape)
+
+    def __add__(self, other):
+        return _elementwise(operator.add, self, other)
+
+    def __sub__(self, other):
+        return _elementwise(operator.sub, self, other)
+
+    def __mul__(self, other):
+        return _elementwise(operator.mul, self, other)
+
+    def __truediv__(self, other):
+        return _elementwise(operator.truediv, self, other)
+
+    def __pow__(self, other):
+        return _elementwise(operator.pow, self, other)
+
+    def __radd__(self, other):
+        return _elementwise(operator.add, other, self)
+
+    def __rsub__(self, other):
+        return _elementwise(operator.sub, other, self)
+
+    def __rmul__(self, other):
+        return _elementwise(operator.mul, other, self)
+
+    def __rtruediv__(self, other):
+        return _elementwise(operator.truediv, other, self)
+
+    def __rpow__(self, other):
+        return _elementwise(operator.pow, other, self)
+
+    def __matmul__(self, other):
+        return _matmul(self, other)
+
+    def __rmatmul__(self, other):
+        return _matmul(other, self)
+
+    def __neg__(self):
+        return self._map(operator.neg)
+
+    def exp(self):
+        return self._map(operator.methodcaller('exp'))
+
+    def log(self):
+        return self._map(operator.methodcaller('log'))
+
+    def tanh(self):
+        return self._map(operator.methodcaller('tanh'))
+
+    def relu(self):
+        return self._map(operator.methodcaller('relu'))
+
+    def sigmoid(self):
+        return self._map(operator.methodcaller('sigmoid'))
+
+    def sum(self, axis=None):
+        """Return the sum along axis, or of all Values, each sum being one node"""
+        return self._reduce(lambda values: Value.dot([1] * len(values), values), axis)
+
+    def mean(self, axis=None):
+        """Return the mean along axis, or of all Values, each mean being one node"""
+        return self._reduce(lambda values: Value.dot([1 / len(values)] * len(values), values),
+                            axis)
+
+    def max(self, axis=None):
+        """Return the maximum along axis, or of all Values.
+
+        The maximum is the input Value itself, so no node is added to the graph and the
+        gradient goes to the largest input.
+        """
+        return self._reduce(max, axis)
+
+    def logsumexp(self, axis=None):
+        """Return `log(sum(exp(x)))` along axis, or of all Values, see Value.logsumexp"""
+        return self._reduce(Value.logsumexp, axis)
+
+    def softmax(self, axis=-1):
+        """Return the softmax along axis, computed by one node per softmax, see
+        Value.softmax"""
+        axis = _normalize_index(axis, self.dim)
+        lanes = self._lanes(axis)
+        size = self.shape[axis]
+        p = [p_i for i in range(0, len(lanes), size) for p_i in Value.softmax(lanes[i:i + size])]
+        axes = [a for a in range(self.dim) if a != axis] + [axis]
+        p = ValueArray._view(p, [self.shape[a] for a in axes])
+        return p.transpose([axes.index(a) for a in range(self.dim)])
+
+    def _reduce(self, function, axis):
+        """Apply function to the list of Values along axis, or to all of them.
+
+        The result has the shape of the Array without axis, a single Value is returned
+        as it is.
+        """
+        if axis is None:
+            return function(self._elements())
+        axis = _normalize_index(axis, self.dim)
+        lanes = self._lanes(axis)
+        size = self.shape[axis]
+        out = [function(lanes[i:i + size]) for i in range(0, len(lanes), size)]
+        if self.dim == 1:
+            return out[0]
+        return ValueArray._view(out, self.shape[:axis] + self.shape[axis + 1:])
+
+    def _lanes(self, axis):
+        """Return the Values in a flat list, with those along axis next to each other"""
+        axes = [a for a in range(self.dim) if a != axis] + [axis]
+        return self.transpose(axes)._elements()
 
     def zero_grad(self):
         """Reset the gradients to zero"""
-        self._recursive_zero_grad(self.values)
-
-    def _recursive_zero_grad(self, data):
-        if isinstance(data, Value):
-            data.grad = 0
-        else:
-            for item in data:
-                self._recursive_zero_grad(item)
+        for value in self._elements():
+            value.grad = 0
 
     def __repr__(self):
         self._max_str_len = _get_max_str_len(self.values, max_len=0)
@@ -196,23 +416,135 @@ class ValueArray(Sequence):
             return "[" + join_str.join(self._repr_helper(item, depth - 1) for item in data) + "]"
 
 
-def _create_array_from_data(data, label=''):
-    """Create an Array from a nested list"""
+def _create_storage(data, label='', requires_grad=True):
+    """Flatten nested data into a list of Values in row-major order, and find its shape.
+
+    Each nested list is checked against the shape found from the first item of each
+    dimension, in one pass over the data.
+    """
     if isinstance(data, Generator):
         data = list(data)
 
-    if not isinstance(data, Iterable):
-        return [Value(data, label=label)]
-    if not isinstance(data[0], Iterable):
+    if not (isinstance(data, ValueArray) or _is_sequence(data)):
+        return [Value(data, label, requires_grad)], (1, )
+    shape = []
+    item = data
+    while isinstance(item, ValueArray) or _is_sequence(item):
+        if isinstance(item, ValueArray):
+            shape.extend(item.shape)
+            break
+        shape.append(len(item))
+        item = item[0]
+    storage = []
+    _fill_storage(storage, data, tuple(shape), label, requires_grad)
+    return storage, tuple(shape)
+
+
+def _fill_storage(storage, data, shape, label, requires_grad):
+    if isinstance(data, ValueArray):
+        data = data.values
+    if not _is_sequence(data) or len(data) != shape[0]:
+        raise ValueError("Array has inconsistent shape.")
+
+    if len(shape) > 1:
+        for i, item in enumerate(data):
+            _fill_storage(storage, item, shape[1:], f'{label}_{i}' if label else '',
+                          requires_grad)
+        return
+    try:
         if label:
-            return [Value(data[i], label=f'{label}_{i}') for i in range(len(data))]
+            storage += [Value(item, f'{label}_{i}', requires_grad) for i, item in enumerate(data)]
         else:
-            return [Value(data[i]) for i in range(len(data))]
-    else:
-        if label:
-            return [_create_array_from_data(data[i], f'{label}_{i}') for i in range(len(data))]
-        else:
-            return [_create_array_from_data(data[i]) for i in range(len(data))]
+            storage += [Value(item, requires_grad=requires_grad) for item in data]
+    except TypeError:
+        if any(isinstance(item, ValueArray) or _is_sequence(item) for item in data):
+            raise ValueError("Array has inconsistent shape.") from None
+        raise
+
+
+def _elementwise(function, a, b):
+    """Apply function to each pair of Values of a and b, broadcasting them as in numpy"""
+    a, b = _as_operand(a), _as_operand(b)
+    shape = _broadcast_shapes(a.shape, b.shape)
+    values = map(function, a._broadcast_to(shape)._elements(), b._broadcast_to(shape)._elements())
+    return ValueArray._view(list(values), shape)
+
+
+def _matmul(a, b):
+    """Multiply a and b as numpy.matmul does, with one Value.matmul node per matrix product.
+
+    A 1D a is a row vector and a 1D b a column vector, their dimension is removed from the
+    result. The dimensions before the last two are a batch, broadcast between a and b.
+    """
+    a, b = _as_operand(a), _as_operand(b)
+    if a.dim == 1 and b.dim == 1:
+        return Value.dot(a._elements(), b._elements())
+    a_matrix = a.reshape(1, -1) if a.dim == 1 else a
+    b_matrix = b.reshape(-1, 1) if b.dim == 1 else b
+    (m, k), (k_b, n) = a_matrix.shape[-2:], b_matrix.shape[-2:]
+    if k != k_b:
+        raise ValueError(f"Can't multiply arrays of shape {a.shape} and {b.shape}")
+
+    batch = _broadcast_shapes(a_matrix.shape[:-2], b_matrix.shape[:-2])
+    a_batch = a_matrix._broadcast_to(batch + (m, k)).reshape(-1, m, k)
+    b_batch = b_matrix._broadcast_to(batch + (k, n)).reshape(-1, k, n)
+    out = []
+    for a_i, b_i in zip(a_batch, b_batch):
+        for row in Value.matmul(a_i.values, b_i.values):
+            out.extend(row)
+    shape = batch + ((m, ) if a.dim > 1 else ()) + ((n, ) if b.dim > 1 else ())
+    return ValueArray._view(out, shape)
+
+
+def _as_operand(x):
+    """Return x as a ValueArray, numbers and nested lists of numbers become constants"""
+    if isinstance(x, ValueArray):
+        return x
+    if isinstance(x, Value):
+        return ValueArray._view([x], (1, ))
+    return ValueArray(x, requires_grad=False)
+
+
+def _broadcast_shapes(a, b):
+    """Return the shape of a and b broadcast together, aligning their last dimensions"""
+    ndim = max(len(a), len(b))
+    shape = []
+    for size_a, size_b in zip((1, ) * (ndim - len(a)) + a, (1, ) * (ndim - len(b)) + b):
+        if size_a != size_b and 1 not in (size_a, size_b):
+            raise ValueError(f"Can't broadcast shapes {a} and {b}")
+        shape.append(size_b if size_a == 1 else size_a)
+    return tuple(shape)
+
+
+def _is_sequence(data):
+    return isinstance(data, Iterable) and not isinstance(data, str)
+
+
+def _contiguous_strides(shape):
+    """Return the strides of an Array of the given shape stored in row-major order"""
+    strides = []
+    stride = 1
+    for size in reversed(shape):
+        strides.append(stride)
+        stride *= size
+    return tuple(reversed(strides))
+
+
+def _nest(elements, shape):
+    """Split a flat list into nested lists of the given shape"""
+    for size in reversed(shape[1:]):
+        elements = [elements[i:i + size] for i in range(0, len(elements), size)]
+    return elements
+
+
+def _normalize_index(index, size):
+    """Return a non-negative index, checking it's within size"""
+    index = operator.index(index)
+    if index < 0:
+        index += size
+    if not 0 <= index < size:
+        raise IndexError(f"Index {index} is out of bounds for a dimension of size {size}")
+    return index
 
 
 def _create_zeros_data(shape):
@@ -224,52 +556,18 @@ def _create_zeros_data(shape):
 
 def _create_random_normal_data(shape, mean=0, std=1):
     if len(shape) == 1:
-        return [Value(random.gauss(mean, std)) for _ in range(shape[0])]
+        return [random.gauss(mean, std) for _ in range(shape[0])]
     else:
         return [_create_random_normal_data(shape[1:], mean, std) for _ in range(shape[0])]
 
 
 def _create_random_uniform_data(shape, low=0, high=1):
     if len(shape) == 1:
-        return [Value(random.uniform(low, high)) for _ in range(shape[0])]
+        return [random.uniform(low, high) for _ in range(shape[0])]
     else:
         return [_create_random_uniform_data(shape[1:], low, high) for _ in range(shape[0])]
 
 
-def _get_shape_from_data(data):
-    """Recursively find the shape of the nested list"""
-    if not isinstance(data, list):
-        return []
-    else:
-        shape = None
-        for item in data:
-            if shape is None:
-                shape = _get_shape_from_data(item)
-            else:
-                new_shape = _get_shape_from_data(item)
-                if new_shape != shape:
-                    raise ValueError("Array has inconsistent shape.")
-        return [len(data)] + shape
-
-
-def _convert_slice_to_range(slice_obj, data):
-    return range(*slice_obj.indices(len(data)))
-
-
-def _verify_integrity(current_idx, value):
-    """Verify that the shape of the value matches the shape of the slice when setting data"""
-    if not isinstance(current_idx, Iterable):
-        current_idx = [current_idx]
-    if not isinstance(value, Iterable):
-        value = [value]
-
-    if not len(current_idx) == len(value):
-        raise ValueError(
-            f"Shape mismatch: Trying to set data of lenth {len(value)} "
-            f"on slice of length {len(current_idx)}"
-        )
-
-
 def _get_max_str_len(data, max_len=0):
     """Recursively find the longest number in a nested list"""
     if not isinstance(data, list):
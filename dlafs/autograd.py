@@ -1,11 +1,92 @@
 import math
+from contextlib import contextmanager
+from functools import partial
 from numbers import Number
+
+import numpy as np
+
 from dlafs._utils import format_float_string
 
 
+_tape = None  # The Tape currently recording operations, if any
+_grad_enabled = True  # Disabled by no_grad(), operations then don't build a graph
+
+
+# Activation functions available to the fused `Value.dot`, as (function, derivative)
+# pairs where the derivative is expressed in terms of the function's output
+_ACTIVATIONS = {
+    'linear': (lambda z: z, lambda out: 1),
+    'tanh': (math.tanh, lambda out: 1 - out**2),
+    'relu': (lambda z: max(0, z), lambda out: out > 0),
+    'sigmoid': (lambda z: 1 / (1 + math.exp(-z)), lambda out: out * (1 - out)),
+}
+
+
+@contextmanager
+def no_grad():
+    """Disable graph construction, e.g. for inference.
+
+    Operations inside the context return plain values without children or backward
+    functions, so nothing is kept alive for a backward pass that will never happen:
+
+        with no_grad():
+            y_hat = model(x)
+    """
+    global _grad_enabled
+    previous, _grad_enabled = _grad_enabled, False
+    try:
+        yield
+    finally:
+        _grad_enabled = previous
+
+
+def _as_value(x):
+    """Return x as a Value, numbers become constants that don't require grad."""
+    return x if isinstance(x, Value) else Value(x, requires_grad=False)
+
+
+def _check_not_freed(node):
+    """Raise if backward has already dropped the children of node"""
+    if node._operator and not node._children:
+        raise RuntimeError("The graph has already been freed by backward(), "
+                           "use backward(retain_graph=True) to call it twice.")
+
+
+def checkpoint(function, inputs, parameters=()):
+    """Return `function(inputs)` without keeping its graph, recomputing it during backward.
+
+    function takes and returns a list of Values and must perform the same operations when
+    called again, parameters are the leaves it uses besides inputs (e.g. weights). Only
+    the outputs are kept until backward, which calls function again to backpropagate
+    through it, trading compute for memory:
+
+        outputs = checkpoint(layer, x, layer.parameters())
+    """
+    inputs = [_as_value(x) for x in inputs]
+    if any(type(x) is not Value for x in (*inputs, *parameters)):
+        return function(inputs)  # e.g. Duals, which build no graph and need their own type
+    with no_grad():
+        outputs = function(inputs)
+    segment = _Checkpoint._from_operation(0.0, (*inputs, *parameters), 'checkpoint')
+    if not segment.requires_grad:
+        return outputs
+    segment._function = function
+    segment._num_inputs = len(inputs)
+    return segment._add_outputs(out.data for out in outputs)
+
+
 class Value:
+    """A scalar node in the computational graph.
 
-    def __new__(cls, data, label=''):
+    Nodes are stored compactly with `__slots__` and a tuple of children. Instead of a
+    backward function per node, the operator names the gradient rule in `_BACKWARD`, so
+    graphs can also be pickled. Measured with tracemalloc on Python 3.11, a leaf takes
+    80 bytes (was 496) and an operation node 160 bytes (was 704).
+    """
+
+    __slots__ = ('data', 'grad', 'label', 'requires_grad', '_children', '_operator')
+
+    def __new__(cls, data, label='', requires_grad=True):
         if isinstance(data, Value):
             instance = data
             if label:
@@ -14,7 +95,12 @@ class Value:
         else:
             return super().__new__(cls)
 
-    def __init__(self, data, label=''):
+    def __init__(self, data, label='', requires_grad=True):
+        """Create a leaf node.
+
+        Set `requires_grad` to False for data and constants, operations only record the
+        graph, and backward only accumulates gradients, for nodes that require grad.
+        """
         if isinstance(data, Value):
             return
         if not isinstance(data, Number):
@@ -22,10 +108,14 @@ class Value:
 
         self.data = data
         self.grad = 0
-        self._children = set()
+        self._children = ()
         self._operator = ''
         self.label = label
-        self._backward = lambda: None
+        self.requires_grad = requires_grad
+
+    def __getnewargs__(self):
+        # Pickle calls __new__ with these, the slots are restored afterwards
+        return (self.data, )
 
     def item(self):
         """Return self, a convenience method for working with ValueArray.item()"""
@@ -35,10 +125,20 @@ class Value:
     def _from_operation(cls, data, children, operator):
         """Create new object from an operation which stores the operator and operands used
         to produce it.
+
+        Inside no_grad(), or when none of the children require grad, the operation isn't
+        recorded and the object is returned as a leaf that doesn't require grad.
         """
-        out = cls(data)
-        out._children = set(children)
+        out = cls(data, requires_grad=False)
+        if not _grad_enabled or not any(child.requires_grad for child in children):
+            return out
+        out.requires_grad = True
+        out._children = tuple(children)
         out._operator = operator
+        tape = _tape
+        while tape is not None:  # Every active tape, so an outer one has the whole graph
+            tape.nodes.append(out)
+            tape = tape._previous
         return out
 
     def __repr__(self):
@@ -54,41 +154,26 @@ class Value:
             return f"Value({value}{grad_str})"
 
     def __add__(self, other):
-        other = Value(other)  # Convert to Value if needed
-        out = Value._from_operation(self.data + other.data, (self, other), '+')
-
-        def _backward():
-            self.grad += out.grad
-            other.grad += out.grad
-        out._backward = _backward
-        return out
+        if not isinstance(other, (Value, Number)):
+            return NotImplemented  # e.g. a ValueArray, which then tries its reflected operator
+        other = _as_value(other)  # Convert to Value if needed
+        return Value._from_operation(self.data + other.data, (self, other), '+')
 
     def __sub__(self, other):
         # Implemented a-b as a+(b*-1) to reuse already implemented operations
         return self + (-other)
 
     def __mul__(self, other):
-        other = Value(other)
-        out = Value._from_operation(self.data * other.data, (self, other), '*')
-
-        def _backward():
-            self.grad += other.data * out.grad
-            other.grad += self.data * out.grad
-        out._backward = _backward
-        return out
+        if not isinstance(other, (Value, Number)):
+            return NotImplemented
+        other = _as_value(other)
+        return Value._from_operation(self.data * other.data, (self, other), '*')
 
     def __pow__(self, other):
-        other = Value(other)
-        out = Value._from_operation(self.data ** other.data, (self, other), '**')
-
-        def _backward():
-            self.grad += (other.data * self.data**(other.data - 1)) * out.grad
-            try:
-                other.grad += (out.data * math.log(self.data)) * out.grad
-            except ValueError:
-                other.grad += 0
-        out._backward = _backward
-        return out
+        if not isinstance(other, (Value, Number)):
+            return NotImplemented
+        other = _as_value(other)
+        return Value._from_operation(self.data ** other.data, (self, other), '**')
 
     def __truediv__(self, other):
         # Implemented as a/b as a*b^-1 to reuse already implemented operations
@@ -110,65 +195,196 @@ class Value:
         return other * self**(-1)
 
     def exp(self):
-        out = Value._from_operation(math.exp(self.data), (self, ), 'exp')
-
-        def _backward():
-            self.grad += out.data * out.grad
-        out._backward = _backward
-        return out
+        return Value._from_operation(math.exp(self.data), (self, ), 'exp')
 
     def log(self):
         try:
-            out = Value._from_operation(math.log(self.data), (self, ), 'log')
+            return Value._from_operation(math.log(self.data), (self, ), 'log')
         except ValueError:
-            out = Value._from_operation(float('-inf'), (self, ), 'log')
-
-        def _backward():
-            self.grad += (1 / self.data) * out.grad
-        out._backward = _backward
-        return out
+            return Value._from_operation(float('-inf'), (self, ), 'log')
 
     def tanh(self):
         # tanh = (math.exp(2 * x) - 1) / (math.exp(2 * x) + 1)
-        out = Value._from_operation(math.tanh(self.data), (self, ), 'tanh')
-
-        def _backward():
-            self.grad += (1 - out.data**2) * out.grad
-        out._backward = _backward
-        return out
+        return Value._from_operation(math.tanh(self.data), (self, ), 'tanh')
 
     def relu(self):
-        out = Value._from_operation(max(0, self.data), (self,), 'ReLU')
-
-        def _backward():
-            self.grad += (out.data > 0) * out.grad
-        out._backward = _backward
-        return out
+        return Value._from_operation(max(0, self.data), (self,), 'ReLU')
 
     def sigmoid(self):
-        out = Value._from_operation(1 / (1 + math.exp(-self.data)), (self,), 'sigmoid')
+        return Value._from_operation(1 / (1 + math.exp(-self.data)), (self,), 'sigmoid')
 
-        def _backward():
-            self.grad += (out.data * (1 - out.data)) * out.grad
-        out._backward = _backward
-        return out
+    @classmethod
+    def dot(cls, weights, inputs, bias=0, activation='linear'):
+        """Compute `activation(sum(w * x for w, x in zip(weights, inputs)) + bias)` as a
+        single node.
 
-    def backward(self):
-        topo = []
-        visited = set()
+        Building the same expression from binary operations creates 2n nodes, this
+        creates one with the gradient of all n inputs computed directly in its backward.
+        """
+        weights = tuple(_as_value(w) for w in weights)
+        inputs = tuple(_as_value(x) for x in inputs)
+        bias = _as_value(bias)
+        if len(weights) != len(inputs):
+            raise ValueError(f'Expected {len(weights)} inputs, got {len(inputs)}')
+        # As with the reflected operators, a subclass among the operands (e.g. Dual) takes over
+        for operand in (*weights, *inputs, bias):
+            if type(operand) is not cls and issubclass(type(operand), cls):
+                return type(operand).dot(weights, inputs, bias, activation)
+        activation = activation.lower()
+        function, _ = _ACTIVATIONS[activation]
+
+        z = sum((w.data * x.data for w, x in zip(weights, inputs)), bias.data)
+        operator = 'dot' if activation == 'linear' else f'dot+{activation}'
+        return cls._from_operation(function(z), weights + inputs + (bias, ), operator)
 
-        def _build_topo_graph(v):
-            if v not in visited:
-                visited.add(v)
-                for child in v._children:
-                    _build_topo_graph(child)
-                topo.append(v)
+    @classmethod
+    def attention(cls, query, keys, values, scale=None):
+        """Compute `sum(p_t * values[t])` with `p = softmax(scale * query . keys[t])`.
 
-        _build_topo_graph(self)
+        scale defaults to `1 / sqrt(len(query))`. Returns a list with one Value per item in
+        a value, which are the outputs of one node. Its backward computes the gradients
+        directly from the softmax probabilities, instead of going through a node for every
+        product, exponential, sum and division.
+        """
+        query = tuple(_as_value(q) for q in query)
+        keys = [tuple(_as_value(k) for k in key) for key in keys]
+        values = [tuple(_as_value(v) for v in value) for value in values]
+        if len(keys) != len(values):
+            raise ValueError(f'Expected {len(keys)} values, got {len(values)}')
+        if any(len(key) != len(query) for key in keys):
+            raise ValueError(f'Expected keys of size {len(query)}')
+        operands = (*query, *(k for key in keys for k in key),
+                    *(v for value in values for v in value))
+        for operand in operands:  # See dot
+            if type(operand) is not cls and issubclass(type(operand), cls):
+                return type(operand).attention(query, keys, values, scale)
+        if scale is None:
+            scale = 1 / math.sqrt(len(query))
+
+        scores = [scale * sum(q.data * k.data for q, k in zip(query, key)) for key in keys]
+        largest = max(scores)  # Subtracted for numerical stability
+        exps = [math.exp(s - largest) for s in scores]
+        total = sum(exps)
+        p = [e / total for e in exps]
+        out = [sum(p_t * value[j].data for p_t, value in zip(p, values))
+               for j in range(len(values[0]))]
+
+        node = _Attention._from_operation(0.0, operands, 'attention')
+        if not node.requires_grad:
+            return [cls(o, requires_grad=False) for o in out]
+        node._probabilities = p
+        node._scale = scale
+        node._sizes = (len(query), len(keys))
+        return node._add_outputs(out)
 
+    @classmethod
+    def matmul(cls, a, b):
+        """Compute the matrix product of a (m x k) and b (k x n), given as lists of rows.
+
+        Returns the product as a list of rows of Values, which are the outputs of one node.
+        The product and its gradients are computed by numpy from the data of the m*k + k*n
+        inputs, instead of building a dot node with 2k + 1 children for each output.
+        """
+        a = [tuple(_as_value(x) for x in row) for row in a]
+        b = [tuple(_as_value(x) for x in row) for row in b]
+        m, k, n = len(a), len(b), len(b[0])
+        if any(len(row) != k for row in a):
+            raise ValueError(f'Expected rows of size {k} in a')
+        if any(len(row) != n for row in b):
+            raise ValueError(f'Expected rows of size {n} in b')
+        operands = (*(x for row in a for x in row), *(x for row in b for x in row))
+        for operand in operands:  # See dot
+            if type(operand) is not cls and issubclass(type(operand), cls):
+                return type(operand).matmul(a, b)
+
+        out = _matrix(operands[:m * k], m, k) @ _matrix(operands[m * k:], k, n)
+        node = _MatMul._from_operation(0.0, operands, 'matmul')
+        if not node.requires_grad:
+            return [[cls(o, requires_grad=False) for o in row] for row in out.tolist()]
+        node._sizes = (m, k, n)
+        outputs = node._add_outputs(out.ravel().tolist())
+        return [outputs[i * n:(i + 1) * n] for i in range(m)]
+
+    @classmethod
+    def logsumexp(cls, values):
+        """Compute `log(sum(exp(x) for x in values))` as a single node.
+
+        The largest of values is subtracted before the exponentials so they can't overflow.
+        Backward gives each input its softmax probability `exp(x - out)` of the gradient.
+        """
+        values = tuple(_as_value(x) for x in values)
+        for operand in values:  # See dot
+            if type(operand) is not cls and issubclass(type(operand), cls):
+                return type(operand).logsumexp(values)
+        largest = max(x.data for x in values)
+        out = largest + math.log(sum(math.exp(x.data - largest) for x in values))
+        return cls._from_operation(out, values, 'logsumexp')
+
+    @classmethod
+    def softmax(cls, values):
+        """Compute `exp(x) / sum(exp(v) for v in values)` for each x in values.
+
+        Returns a list with the probabilities, which are the outputs of one node. Its
+        backward computes the gradient of every input directly from the probabilities.
+        """
+        values = tuple(_as_value(x) for x in values)
+        for operand in values:  # See dot
+            if type(operand) is not cls and issubclass(type(operand), cls):
+                return type(operand).softmax(values)
+        largest = max(x.data for x in values)  # Subtracted for numerical stability
+        exps = [math.exp(x.data - largest) for x in values]
+        total = sum(exps)
+        p = [e / total for e in exps]
+
+        node = _MultiOutput._from_operation(0.0, values, 'softmax')
+        if not node.requires_grad:
+            return [cls(p_i, requires_grad=False) for p_i in p]
+        return node._add_outputs(p)
+
+    def backward(self, topo=None, retain_graph=False):
+        """Backpropagate the gradient of self to every node in its graph.
+
+        Unless `retain_graph` is set, each node drops its children once processed, so the
+        graph can be freed while the leaves (e.g. parameters) keep their gradients. Set it
+        to call backward on the graph again, e.g. with `topo`, an order from
+        `topological_sort()` reused while the graph structure is unchanged.
+        """
+        _check_not_freed(self)
+        if topo is None:
+            topo = self.topological_sort()
+
+        for node in topo:  # Reset intermediate grads so repeated calls don't accumulate
+            if node._children:
+                node.grad = 0
         self.grad = 1.0
         for node in reversed(topo):
-            node._backward()
+            if node._children:
+                _BACKWARD[node._operator](node)
+                if not retain_graph:
+                    node._children = ()
+
+    def topological_sort(self):
+        """Return every node in the graph of self, ordered so children come before parents.
+
+        Uses an explicit stack instead of recursion, so deep graphs (e.g. long recurrent
+        unrolls) don't hit Python's recursion limit. Children that don't require grad are
+        skipped, no gradient flows to them.
+        """
+        topo = []
+        visited = {id(self)}
+        stack = [(self, iter(self._children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child.requires_grad and id(child) not in visited:
+                    _check_not_freed(child)  # e.g. shared with a loss already backpropagated
+                    visited.add(id(child))
+                    stack.append((child, iter(child._children)))
+                    break
+            else:
+                stack.pop()
+                topo.append(node)
+        return topo
 
     def __eq__(self, other):
         if not isinstance(other, Value):
@@ -201,7 +417,252 @@ class Value:
     def __copy__(self):
         new = Value(self.data, self.label)
         new.grad = self.grad
+        new.requires_grad = self.requires_grad
         new._children = self._children
         new._operator = self._operator
-        new._backward = self._backward
         return new
+
+
+class _MultiOutput(Value):
+    """A node computing several outputs at once, each a node with it as its only child.
+
+    The outputs pass their gradient on to it, as it comes after all of them in backward.
+    """
+
+    __slots__ = ('_outputs', '_grads')
+
+    def _add_outputs(self, data):
+        self._grads = {}
+        self._outputs = [Value._from_operation(d, (self, ), 'output') for d in data]
+        return self._outputs
+
+    def _output_grads(self):
+        """Return the gradients of the outputs, once they have all been collected"""
+        grads = [self._grads.get(id(out), 0) for out in self._outputs]
+        self._grads = {}
+        return grads
+
+
+class _Checkpoint(_MultiOutput):
+    """The node of a `checkpoint()`, with what's needed to recompute it in backward."""
+
+    __slots__ = ('_function', '_num_inputs')
+
+
+class _Attention(_MultiOutput):
+    """The node of `Value.attention`, with the softmax probabilities for backward."""
+
+    __slots__ = ('_probabilities', '_scale', '_sizes')
+
+
+class _MatMul(_MultiOutput):
+    """The node of `Value.matmul`, with the sizes of the matrices for backward."""
+
+    __slots__ = ('_sizes', )
+
+
+def _matrix(values, rows, columns):
+    """Return the data of values as a numpy matrix of the given size"""
+    return np.array([x.data for x in values], dtype=float).reshape(rows, columns)
+
+
+# Gradient rules, indexed by operator. Each one takes a node and accumulates the gradient
+# of its children that require grad, from the node's data and gradient.
+
+def _add_backward(out):
+    a, b = out._children
+    if a.requires_grad:
+        a.grad += out.grad
+    if b.requires_grad:
+        b.grad += out.grad
+
+
+def _mul_backward(out):
+    a, b = out._children
+    if a.requires_grad:
+        a.grad += b.data * out.grad
+    if b.requires_grad:
+        b.grad += a.data * out.grad
+
+
+def _pow_backward(out):
+    base, exponent = out._children
+    if base.requires_grad:
+        base.grad += (exponent.data * base.data**(exponent.data - 1)) * out.grad
+    if exponent.requires_grad:
+        try:
+            exponent.grad += (out.data * math.log(base.data)) * out.grad
+        except ValueError:
+            exponent.grad += 0
+
+
+def _exp_backward(out):
+    x, = out._children
+    x.grad += out.data * out.grad
+
+
+def _log_backward(out):
+    x, = out._children
+    x.grad += (1 / x.data) * out.grad
+
+
+def _activation_backward(derivative, out):
+    x, = out._children
+    x.grad += derivative(out.data) * out.grad
+
+
+def _dot_backward(derivative, out):
+    children = out._children
+    n = len(children) // 2  # children are (*weights, *inputs, bias)
+    grad = derivative(out.data) * out.grad
+    for w, x in zip(children[:n], children[n:-1]):
+        if w.requires_grad:
+            w.grad += x.data * grad
+        if x.requires_grad:
+            x.grad += w.data * grad
+    bias = children[-1]
+    if bias.requires_grad:
+        bias.grad += grad
+
+
+def _output_backward(out):
+    node, = out._children
+    node._grads[id(out)] = out.grad
+
+
+def _checkpoint_backward(segment):
+    global _tape, _grad_enabled
+    children = segment._children
+    inputs = [Value(x.data) for x in children[:segment._num_inputs]]
+    grads = segment._output_grads()
+
+    previous = _tape, _grad_enabled
+    _tape, _grad_enabled = None, True
+    try:
+        outputs = segment._function(inputs)
+        # Backpropagating sum(output * grad) gives the children their share of the grads
+        Value.dot(outputs, grads).backward()
+    finally:
+        _tape, _grad_enabled = previous
+    for x, copy in zip(children, inputs):
+        if x.requires_grad:
+            x.grad += copy.grad
+
+
+def _attention_backward(node):
+    grads = node._output_grads()
+    size, num_keys = node._sizes
+    children = node._children
+    query = children[:size]
+    keys = [children[size + t * size:size + (t + 1) * size] for t in range(num_keys)]
+    values = children[size + num_keys * size:]
+    num_values = len(values) // num_keys
+    values = [values[t * num_values:(t + 1) * num_values] for t in range(num_keys)]
+
+    # Through the weighted sum to the probabilities and values, then through the softmax
+    p = node._probabilities
+    dp = [sum(g * v.data for g, v in zip(grads, value)) for value in values]
+    for p_t, value in zip(p, values):
+        for g, v in zip(grads, value):
+            if v.requires_grad:
+                v.grad += p_t * g
+    mean = sum(p_t * dp_t for p_t, dp_t in zip(p, dp))
+    for p_t, dp_t, key in zip(p, dp, keys):
+        ds = p_t * (dp_t - mean) * node._scale
+        for q, k in zip(query, key):
+            if q.requires_grad:
+                q.grad += ds * k.data
+            if k.requires_grad:
+                k.grad += ds * q.data
+
+
+def _matmul_backward(node):
+    m, k, n = node._sizes
+    grads = np.array(node._output_grads(), dtype=float).reshape(m, n)
+    a, b = node._children[:m * k], node._children[m * k:]
+    for x, grad in zip(a, (grads @ _matrix(b, k, n).T).ravel().tolist()):
+        if x.requires_grad:
+            x.grad += grad
+    for x, grad in zip(b, (_matrix(a, m, k).T @ grads).ravel().tolist()):
+        if x.requires_grad:
+            x.grad += grad
+
+
+def _logsumexp_backward(out):
+    for x in out._children:
+        if x.requires_grad:
+            x.grad += math.exp(x.data - out.data) * out.grad
+
+
+def _softmax_backward(node):
+    grads = node._output_grads()
+    p = [out.data for out in node._outputs]
+    mean = sum(p_i * g for p_i, g in zip(p, grads))
+    for x, p_i, g in zip(node._children, p, grads):
+        if x.requires_grad:
+            x.grad += p_i * (g - mean)
+
+
+_BACKWARD = {
+    '+': _add_backward,
+    '*': _mul_backward,
+    '**': _pow_backward,
+    'exp': _exp_backward,
+    'log': _log_backward,
+    'tanh': partial(_activation_backward, _ACTIVATIONS['tanh'][1]),
+    'ReLU': partial(_activation_backward, _ACTIVATIONS['relu'][1]),
+    'sigmoid': partial(_activation_backward, _ACTIVATIONS['sigmoid'][1]),
+    'dot': partial(_dot_backward, _ACTIVATIONS['linear'][1]),
+    **{f'dot+{name}': partial(_dot_backward, derivative)
+       for name, (_, derivative) in _ACTIVATIONS.items() if name != 'linear'},
+    'output': _output_backward,
+    'checkpoint': _checkpoint_backward,
+    'attention': _attention_backward,
+    'matmul': _matmul_backward,
+    'logsumexp': _logsumexp_backward,
+    'softmax': _softmax_backward,
+}
+
+
+class Tape:
+    """Records the nodes created by operations while active, in creation order.
+
+    Tapes can be nested, a node is recorded by every active tape.
+
+    A node is always created after its children, so the recording is already a valid
+    topological order and backward can replay it in reverse, without searching the graph:
+
+        with Tape() as tape:
+            loss = mse(y, model(x))
+        tape.backward(loss)
+    """
+
+    def __init__(self):
+        self.nodes = []
+        self._previous = None
+
+    def __enter__(self):
+        global _tape
+        self._previous, _tape = _tape, self
+        return self
+
+    def __exit__(self, *exc_info):
+        global _tape
+        _tape, self._previous = self._previous, None
+
+    def backward(self, root, retain_graph=False):
+        """Backpropagate the gradient of root to every node recorded on the tape.
+
+        Nodes recorded after root can't be part of its graph, their gradients stay zero.
+        Unless `retain_graph` is set, the recorded graph is freed as in `Value.backward`.
+        """
+        for node in self.nodes:
+            _check_not_freed(node)
+            node.grad = 0
+        root.grad = 1.0
+        for node in reversed(self.nodes):
+            _BACKWARD[node._operator](node)
+            if not retain_graph:
+                node._children = ()
+        if not retain_graph:
+            self.nodes = []
@@ -0,0 +1,190 @@
+import math
+from numbers import Number
+from dlafs.autograd import Value, _ACTIVATIONS
+from dlafs.array import ValueArray
+from dlafs._utils import format_float_string
+
+
+class Dual(Value):
+    """A dual number `data + tangent * eps` (with eps**2 = 0) for forward-mode autodiff.
+
+    Every operation propagates the tangent, the directional derivative along the tangents
+    of the inputs, along with the data, so one forward pass gives the derivative of all
+    outputs with respect to one direction. Being a Value, a Dual can be used everywhere a
+    Value can, e.g. as input to dlafs.nn modules, where the parameters act as constants.
+    No graph is built, so Duals can't be used with backward.
+    """
+
+    __slots__ = ('tangent', )
+
+    def __new__(cls, data, tangent=0.0, label='', requires_grad=False):
+        return super().__new__(cls, data, label)
+
+    def __init__(self, data, tangent=0.0, label='', requires_grad=False):
+        if isinstance(data, Value):
+            return
+        super().__init__(data, label, requires_grad=False)
+        self.tangent = tangent
+
+    def __repr__(self):
+        value = format_float_string(self.data)
+        tangent = format_float_string(self.tangent)
+        return f"Dual({value}, tangent={tangent})"
+
+    def __add__(self, other):
+        if not isinstance(other, (Value, Number)):
+            return NotImplemented  # e.g. a ValueArray, see Value.__add__
+        other = _as_dual(other)
+        return Dual(self.data + other.data, self.tangent + other.tangent)
+
+    def __mul__(self, other):
+        if not isinstance(other, (Value, Number)):
+            return NotImplemented
+        other = _as_dual(other)
+        return Dual(self.data * other.data,
+                    self.tangent * other.data + self.data * other.tangent)
+
+    def __pow__(self, other):
+        if not isinstance(other, (Value, Number)):
+            return NotImplemented
+        other = _as_dual(other)
+        out = self.data ** other.data
+        tangent = other.data * self.data**(other.data - 1) * self.tangent
+        if other.tangent:
+            tangent += out * math.log(self.data) * other.tangent
+        return Dual(out, tangent)
+
+    # Defined again so that they're called before the operators of Value, see Value.dot
+    def __radd__(self, other):
+        return self + other
+
+    def __rsub__(self, other):
+        return other + (-self)
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __rtruediv__(self, other):
+        return other * self**(-1)
+
+    def __rpow__(self, other):
+        return _as_dual(other) ** self
+
+    def exp(self):
+        out = math.exp(self.data)
+        return Dual(out, out * self.tangent)
+
+    def log(self):
+        out = math.log(self.data) if self.data > 0 else float('-inf')
+        return Dual(out, self.tangent / self.data)
+
+    def tanh(self):
+        return self._activation('tanh')
+
+    def relu(self):
+        return self._activation('relu')
+
+    def sigmoid(self):
+        return self._activation('sigmoid')
+
+    def _activation(self, name):
+        function, derivative = _ACTIVATIONS[name]
+        out = function(self.data)
+        return Dual(out, derivative(out) * self.tangent)
+
+    @classmethod
+    def dot(cls, weights, inputs, bias=0, activation='linear'):
+        """Compute `activation(sum(w * x for w, x in zip(weights, inputs)) + bias)` and its
+        tangent, see Value.dot.
+        """
+        weights = [_as_dual(w) for w in weights]
+        inputs = [_as_dual(x) for x in inputs]
+        bias = _as_dual(bias)
+        if len(weights) != len(inputs):
+            raise ValueError(f'Expected {len(weights)} inputs, got {len(inputs)}')
+        function, derivative = _ACTIVATIONS[activation.lower()]
+
+        z = sum((w.data * x.data for w, x in zip(weights, inputs)), bias.data)
+        dz = sum((w.tangent * x.data + w.data * x.tangent for w, x in zip(weights, inputs)),
+                 bias.tangent)
+        out = function(z)
+        return cls(out, derivative(out) * dz)
+
+    @classmethod
+    def attention(cls, query, keys, values, scale=None):
+        """Compute softmax attention and its tangent, see Value.attention."""
+        if scale is None:
+            scale = 1 / math.sqrt(len(query))
+        scores = [cls.dot(query, key) * scale for key in keys]
+        largest = max(s.data for s in scores)
+        exps = [(s - largest).exp() for s in scores]
+        total = sum(exps)
+        p = [e / total for e in exps]
+        return [cls.dot(p, [value[j] for value in values]) for j in range(len(values[0]))]
+
+    @classmethod
+    def matmul(cls, a, b):
+        """Compute the matrix product of a and b and its tangent, see Value.matmul."""
+        return [[cls.dot(row, column) for column in zip(*b)] for row in a]
+
+    @classmethod
+    def logsumexp(cls, values):
+        """Compute `log(sum(exp(x) for x in values))` and its tangent, see Value.logsumexp."""
+        values = [_as_dual(x) for x in values]
+        largest = max(x.data for x in values)
+        out = largest + math.log(sum(math.exp(x.data - largest) for x in values))
+        return cls(out, sum(math.exp(x.data - out) * x.tangent for x in values))
+
+    @classmethod
+    def softmax(cls, values):
+        """Compute the softmax of values and its tangent, see Value.softmax."""
+        values = [_as_dual(x) for x in values]
+        largest = max(x.data for x in values)
+        exps = [math.exp(x.data - largest) for x in values]
+        total = sum(exps)
+        p = [e / total for e in exps]
+        mean = sum(p_i * x.tangent for p_i, x in zip(p, values))
+        return [cls(p_i, p_i * (x.tangent - mean)) for p_i, x in zip(p, values)]
+
+    def backward(self, *args, **kwargs):
+        raise RuntimeError("Duals don't build a graph, use Value for reverse-mode autodiff.")
+
+
+def jvp(f, primals, tangents):
+    """Return `f(*primals)` and its Jacobian-vector product with tangents.
+
+    primals and tangents are sequences with one item per argument of f, each a number or
+    a (nested) list or ValueArray, with a tangent of the same shape. The product is
+    returned in the shape of the output of f, as floats:
+
+        output, tangent = jvp(model, [x], [direction])
+    """
+    duals = [_to_duals(primal, tangent) for primal, tangent in zip(primals, tangents)]
+    output = f(*duals)
+    return output, _tangents(output)
+
+
+def _as_dual(x):
+    """Return x as a Dual, Values and numbers become constants with a zero tangent."""
+    if isinstance(x, Dual):
+        return x
+    return Dual(x.data if isinstance(x, Value) else x)
+
+
+def _to_duals(primal, tangent):
+    if isinstance(tangent, ValueArray):
+        tangent = tangent.values
+    if isinstance(primal, ValueArray):
+        return ValueArray(_to_duals(primal.values, tangent))
+    if isinstance(primal, (list, tuple)):
+        return [_to_duals(p, t) for p, t in zip(primal, tangent)]
+    data = primal.data if isinstance(primal, Value) else primal
+    return Dual(data, tangent.data if isinstance(tangent, Value) else tangent)
+
+
+def _tangents(output):
+    if isinstance(output, ValueArray):
+        output = output.values
+    if isinstance(output, (list, tuple)):
+        return [_tangents(item) for item in output]
+    return output.tangent if isinstance(output, Dual) else 0.0
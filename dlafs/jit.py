@@ -0,0 +1,510 @@
+import builtins
+import hashlib
+import marshal
+import math
+import os
+import sys
+from array import array
+
+from dlafs.autograd import Value
+from dlafs.array import ValueArray
+from dlafs.nn.common import Module
+from dlafs.engine import (
+    Graph, _OPCODES, _LEAF, _ADD, _MUL, _POW, _EXP, _LOG, _TANH, _RELU, _SIGMOID, _SUB, _DIV,
+    _DOT, _DOT_TANH, _DOT_RELU, _DOT_SIGMOID
+)
+
+# Where generated code is cached, keyed by the hash of the graph structure
+CACHE_DIR = os.environ.get(
+    'DLAFS_CACHE_DIR', os.path.join(os.path.expanduser('~'), '.cache', 'dlafs')
+)
+
+
+def compile(model, example_input, loss=None, example_target=None, optimize=True,
+            codegen=False):
+    """Trace the graph of `model(example_input)` once and return a CompiledModel replaying it.
+
+    If a loss function and example target are given, `loss(example_target, output)` is
+    traced as well, and CompiledModel.step() runs forward and backward for new data.
+
+    The trace records the operations performed for the example, so the model must always
+    perform the same operations: control flow that depends on the data (e.g. the
+    clipping with `max` in binary_cross_entropy, or ValueArray.max) keeps the branch taken
+    while tracing, and inputs must have the same shape as the example. Modules that select
+    inputs by their data, like MaxPool1D and MaxPool2D, are rejected with a ValueError, as
+    are Layers with `weight_matrix`, since the Graph has no opcode for a Value.matmul node.
+
+    Unless `optimize` is False, the traced graph is simplified by `optimize_graph`, its
+    report is kept in CompiledModel.optimization_report. With `codegen`, the graph is
+    turned into straight-line Python functions by `generate_source`, instead of being
+    re-executed by Graph.forward and Graph.backward.
+    """
+    _check_traceable(model)
+    # Trace with fresh copies of the data that require grad, so that every operation
+    # depending on them is recorded instead of computed once as a constant.
+    inputs = _copy_as_leaves(example_input)
+    targets = _copy_as_leaves(example_target) if loss is not None else None
+    parameters = model.parameters()
+
+    output = model(inputs)
+    if not isinstance(output, (Value, ValueArray)):
+        output = ValueArray(output)
+    loss_value = loss(targets, output) if loss is not None else None
+
+    graph = Graph()
+    node_ids = {}
+    input_ids = _add_leaves(graph, node_ids, inputs.flatten(), requires_grad=False)
+    target_ids = (_add_leaves(graph, node_ids, targets.flatten(), requires_grad=False)
+                  if targets is not None else [])
+    parameter_ids = _add_leaves(graph, node_ids, parameters)
+
+    output_values = [output] if isinstance(output, Value) else list(output.flatten())
+    roots = output_values + ([loss_value] if loss_value is not None else [])
+    for node in _trace_order(roots):
+        if id(node) in node_ids:
+            continue
+        if node._children and node._operator not in _OPCODES:
+            raise ValueError(f"Can't compile the operation {node._operator!r}")
+        children = [node_ids[id(child)] for child in node._children]
+        opcode = _OPCODES[node._operator] if children else 0
+        node_ids[id(node)] = graph.add_node(node.data, opcode, children, node.requires_grad)
+
+    output_ids = [node_ids[id(value)] for value in output_values]
+    output_shape = None if isinstance(output, Value) else output.shape
+    loss_id = node_ids[id(loss_value)] if loss_value is not None else None
+    report = None
+    if optimize:
+        root_ids = output_ids + ([loss_id] if loss_id is not None else [])
+        graph, new_ids, report = optimize_graph(graph, input_ids + target_ids + parameter_ids,
+                                                root_ids)
+        output_ids = [new_ids[i] for i in output_ids]
+        loss_id = new_ids[loss_id] if loss_id is not None else None
+
+    compiled = CompiledModel(model, graph, input_ids, target_ids, parameter_ids, output_ids,
+                             output_shape, loss_id)
+    compiled.optimization_report = report
+    if codegen:
+        compiled._functions = load_functions(graph, input_ids + target_ids + parameter_ids,
+                                             output_ids, loss_id)
+    return compiled
+
+
+class CompiledModel:
+    """A model traced into a Graph by `compile`.
+
+    Calling it, or `step`, writes new inputs and the current parameters into the leaves of
+    the graph and re-executes it in the traced order, without creating any nodes.
+    """
+
+    def __init__(self, model, graph, input_ids, target_ids, parameter_ids, output_ids,
+                 output_shape, loss_id):
+        self.model = model
+        self.graph = graph
+        self._input_ids = input_ids
+        self._target_ids = target_ids
+        self._parameter_ids = parameter_ids
+        self._output_ids = output_ids
+        self._output_shape = output_shape
+        self._loss_id = loss_id
+        self._functions = None  # Generated functions, see load_functions
+
+    def __call__(self, x):
+        """The forward pass of the traced model, returns Values that don't require grad"""
+        self._forward(x)
+        if self._functions is not None:
+            data = self._functions['forward'](self._leaves())
+        else:
+            self.graph.forward()
+            data = [self.graph.data[i] for i in self._output_ids]
+        if self._output_shape is None:
+            return Value(data[0], requires_grad=False)
+        return ValueArray(_unflatten(data, self._output_shape), requires_grad=False)
+
+    def step(self, x, y):
+        """Run the forward and backward pass of the traced loss, and return the loss.
+
+        The gradients are accumulated into the model parameters, as with loss.backward().
+        """
+        if self._loss_id is None:
+            raise ValueError("The model was compiled without a loss function.")
+        self._set_leaves(self._target_ids, y)
+        self._forward(x)
+        if self._functions is not None:
+            loss, grads = self._functions['step'](self._leaves())
+            grads = iter(grads)  # Only for the parameters that require grad
+            for parameter, i in zip(self.model.parameters(), self._parameter_ids):
+                if self.graph.requires_grad[i]:
+                    parameter.grad += next(grads)
+            return loss
+
+        graph = self.graph
+        graph.forward()
+        graph.backward(self._loss_id)
+        for parameter, i in zip(self.model.parameters(), self._parameter_ids):
+            if graph.requires_grad[i]:
+                parameter.grad += graph.grad[i]
+            graph.grad[i] = 0
+        return graph.data[self._loss_id]
+
+    def _forward(self, x):
+        """Write the inputs and current parameters into the leaves of the graph"""
+        self._set_leaves(self._input_ids, x)
+        data = self.graph.data
+        for parameter, i in zip(self.model.parameters(), self._parameter_ids):
+            data[i] = parameter.data
+
+    def _leaves(self):
+        """Return the data of the inputs, targets and parameters, in the order of their ids"""
+        return self.graph.data[:len(self._input_ids + self._target_ids + self._parameter_ids)]
+
+    def _set_leaves(self, ids, values):
+        values = _flat_data(values)
+        if len(values) != len(ids):
+            raise ValueError(f'Expected {len(ids)} values, got {len(values)}')
+        data = self.graph.data
+        for i, value in zip(ids, values):
+            data[i] = value
+
+
+def _check_traceable(model):
+    """Raise if model, or a module in it, sets `_data_dependent` or uses a weight matrix"""
+    stack, seen = [model], set()
+    while stack:
+        module = stack.pop()
+        if id(module) in seen:
+            continue
+        seen.add(id(module))
+        if getattr(module, '_data_dependent', False):
+            raise ValueError(f"Can't compile {module!r}, its operations depend on the data")
+        if getattr(module, 'weight_matrix', False):
+            raise ValueError(f"Can't compile {module!r}, a weight_matrix uses Value.matmul")
+        for attribute in vars(module).values():
+            items = attribute if isinstance(attribute, (list, tuple)) else [attribute]
+            stack.extend(item for item in items if isinstance(item, Module))
+
+
+def _copy_as_leaves(data):
+    """Copy nested data into a ValueArray of new Values that require grad"""
+    return ValueArray(_unflatten(_flat_data(data), ValueArray(data).shape))
+
+
+def _add_leaves(graph, node_ids, values, requires_grad=None):
+    """Add values as leaves, by default requiring grad if the value does"""
+    ids = []
+    for value in values:
+        leaf_requires_grad = value.requires_grad if requires_grad is None else requires_grad
+        node_ids[id(value)] = graph.add_node(value.data, requires_grad=leaf_requires_grad)
+        ids.append(node_ids[id(value)])
+    return ids
+
+
+def _trace_order(roots):
+    """Return every node in the graphs of roots, children first, including constants"""
+    order = []
+    visited = set()
+    for root in roots:
+        if id(root) in visited:
+            continue
+        visited.add(id(root))
+        stack = [(root, iter(root._children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if id(child) not in visited:
+                    visited.add(id(child))
+                    stack.append((child, iter(child._children)))
+                    break
+            else:
+                stack.pop()
+                order.append(node)
+    return order
+
+
+def _flat_data(data):
+    """Return the numbers in nested lists of numbers, Values or ValueArrays as a flat list"""
+    if isinstance(data, ValueArray):
+        data = data.values
+    if isinstance(data, Value):
+        return [data.data]
+    if not isinstance(data, (list, tuple)):
+        return [data]
+    return [number for item in data for number in _flat_data(item)]
+
+
+def _unflatten(data, shape):
+    """Reshape a flat list into nested lists with the given shape"""
+    if len(shape) == 1:
+        return list(data)
+    size = len(data) // shape[0]
+    return [_unflatten(data[i * size:(i + 1) * size], shape[1:]) for i in range(shape[0])]
+
+
+def optimize_graph(graph, leaf_ids, root_ids):
+    """Return an equivalent Graph with fewer operations, for the nodes root_ids depend on.
+
+    Graphs traced from Values are full of redundancy, so in one pass over the nodes:
+    - operations on constants are folded into a constant
+    - identical operations on the same children are merged
+    - `a * b**-1`, how Value computes `a / b`, is fused into a division
+    - `a + b * -1`, how Value computes `a - b`, is fused into a subtraction
+    - `x + 0`, `x * 1`, `x ** 1` are replaced by x
+    after which nodes the roots don't depend on are removed.
+
+    The leaves in leaf_ids (e.g. inputs and parameters) come first in the new graph, in
+    the same order, every other leaf is taken to be a constant. Returns the new graph, a
+    dict from the old ids of the roots to their new ids, and a report counting the
+    rewrites of each kind and the nodes before and after.
+    """
+    report = dict.fromkeys(('constant_folding', 'common_subexpressions', 'divisions',
+                            'subtractions', 'identities', 'dead_nodes'), 0)
+    new = Graph()
+    new_ids = {i: new.add_node(graph.data[i], requires_grad=graph.requires_grad[i])
+               for i in leaf_ids}
+    constants = {}  # Constant data -> id, constant leaves are merged as well
+    operations = {}  # (opcode, children) -> id
+
+    def is_constant(i, value=None):
+        return new.opcodes[i] == _LEAF and i >= len(leaf_ids) and (
+            value is None or new.data[i] == value)
+
+    def add_constant(data):
+        if data not in constants:
+            constants[data] = new.add_node(data, requires_grad=False)
+        return constants[data]
+
+    for i in range(len(graph)):
+        if i in new_ids:
+            continue
+        opcode = graph.opcodes[i]
+        if opcode == _LEAF:
+            report['common_subexpressions'] += graph.data[i] in constants
+            new_ids[i] = add_constant(graph.data[i])
+            continue
+        children = [new_ids[c] for c in graph.children[graph.offsets[i]:graph.offsets[i + 1]]]
+        if all(is_constant(c) for c in children):  # Its traced data is then always the same
+            new_ids[i] = add_constant(graph.data[i])
+            report['constant_folding'] += 1
+            continue
+
+        a, b = (children + [None])[:2]
+        if opcode == _ADD and (is_constant(a, 0) or is_constant(b, 0)):
+            new_ids[i] = b if is_constant(a, 0) else a
+            report['identities'] += 1
+            continue
+        if opcode == _MUL and (is_constant(a, 1) or is_constant(b, 1)):
+            new_ids[i] = b if is_constant(a, 1) else a
+            report['identities'] += 1
+            continue
+        if opcode == _POW and is_constant(b, 1):
+            new_ids[i] = a
+            report['identities'] += 1
+            continue
+
+        if opcode == _MUL:
+            for numerator, reciprocal in ((a, b), (b, a)):
+                base, exponent = _operands(new, reciprocal, _POW)
+                if exponent is not None and is_constant(exponent, -1):
+                    opcode, children = _DIV, [numerator, base]
+                    report['divisions'] += 1
+                    break
+        elif opcode == _ADD:
+            for term, negated in ((a, b), (b, a)):
+                x, factor = _operands(new, negated, _MUL)
+                if factor is not None and is_constant(factor, -1):
+                    opcode, children = _SUB, [term, x]
+                    report['subtractions'] += 1
+                    break
+
+        key = (opcode, tuple(sorted(children) if opcode in (_ADD, _MUL) else children))
+        if key in operations:
+            new_ids[i] = operations[key]
+            report['common_subexpressions'] += 1
+            continue
+        requires_grad = any(new.requires_grad[c] for c in children)
+        new_ids[i] = operations[key] = new.add_node(graph.data[i], opcode, children,
+                                                    requires_grad)
+
+    # Remove the nodes that the roots don't depend on, e.g. the b**-1 fused into a / b
+    used = set(new_ids[i] for i in root_ids)
+    for i in range(len(new) - 1, -1, -1):
+        if i in used:
+            used.update(new.children[new.offsets[i]:new.offsets[i + 1]])
+    compact = Graph()
+    compact_ids = {}
+    for i in range(len(new)):
+        if i < len(leaf_ids) or i in used:
+            children = [compact_ids[c] for c in new.children[new.offsets[i]:new.offsets[i + 1]]]
+            compact_ids[i] = compact.add_node(new.data[i], new.opcodes[i], children,
+                                              new.requires_grad[i])
+    report['dead_nodes'] = len(new) - len(compact)
+    report['nodes_before'], report['nodes_after'] = len(graph), len(compact)
+    return compact, {i: compact_ids[new_ids[i]] for i in root_ids}, report
+
+
+def _operands(graph, i, opcode):
+    """Return the two children of node i if it's an operation of the given opcode"""
+    if graph.opcodes[i] != opcode:
+        return None, None
+    start = graph.offsets[i]
+    return graph.children[start], graph.children[start + 1]
+
+
+def load_functions(graph, leaf_ids, output_ids, loss_id=None):
+    """Return the functions generated for a graph by `generate_source`, compiled to
+    bytecode, and cache the bytecode in CACHE_DIR under the hash of the graph structure.
+    """
+    structure = hashlib.sha256()
+    leaves = set(leaf_ids)
+    constants = [graph.data[i] for i in range(len(graph))
+                 if not graph.opcodes[i] and i not in leaves]
+    for buffer in (graph.opcodes, graph.requires_grad, graph.offsets, graph.children,
+                   array('q', leaf_ids), array('q', output_ids), array('d', constants)):
+        structure.update(buffer.tobytes())
+    structure.update(repr(loss_id).encode())
+    path = os.path.join(CACHE_DIR, f'{structure.hexdigest()}.{sys.implementation.cache_tag}')
+
+    try:
+        with open(path, 'rb') as file:
+            code = marshal.load(file)
+    except (OSError, EOFError, ValueError, TypeError):
+        source = generate_source(graph, leaf_ids, output_ids, loss_id)
+        code = builtins.compile(source, path, 'exec')
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        with open(path, 'wb') as file:
+            marshal.dump(code, file)
+
+    namespace = {'math': math, 'inf': math.inf}
+    exec(code, namespace)
+    return namespace
+
+
+def generate_source(graph, leaf_ids, output_ids, loss_id=None):
+    """Generate straight-line Python code evaluating a Graph.
+
+    The code defines `forward(leaves)`, returning the data of the outputs, and, if a loss
+    is given, `step(leaves)`, returning the loss and the gradients of the leaves that
+    require grad. Every node is a local variable, `v{id}` for its data and `g{id}` for its
+    gradient, and constants are written as literals, so there are no attribute lookups,
+    function calls or loops apart from the math functions.
+    """
+    leaf_ids = set(leaf_ids)
+    names = {}
+    forward = []
+    for i in range(len(graph)):
+        if graph.opcodes[i] == _LEAF and i not in leaf_ids:
+            names[i] = _literal(graph.data[i])
+        else:
+            names[i] = f'v{i}'
+            if graph.opcodes[i] != _LEAF:
+                forward.append(f'v{i} = {_forward_expression(graph, i, names)}')
+
+    leaves = ', '.join(f'v{i}' for i in sorted(leaf_ids))
+    lines = [f'def forward(leaves):', f'    {leaves}, = leaves']
+    lines += [f'    {line}' for line in forward]
+    lines.append(f"    return [{', '.join(names[i] for i in output_ids)}]")
+    if loss_id is None:
+        return '\n'.join(lines) + '\n'
+
+    backward = [f'g{loss_id} = 1.0']
+    grads = {loss_id}  # Gradients assigned so far, the first += is written as an =
+    for i in range(loss_id, -1, -1):
+        if graph.opcodes[i] != _LEAF and i in grads:
+            if graph.opcodes[i] >= _DOT:  # Shared by the gradients of all children
+                backward.append(f'd{i} = {_derivative_expression(graph.opcodes[i], f"v{i}")}'
+                                f' * g{i}')
+            for child, expression in _backward_expressions(graph, i, names):
+                if not graph.requires_grad[child] or names[child][0] != 'v':
+                    continue
+                backward.append(f"g{child} {'+=' if child in grads else '='} {expression}")
+                grads.add(child)
+    grad_ids = [i for i in sorted(leaf_ids) if graph.requires_grad[i]]
+
+    lines += ['', '', 'def step(leaves):', f'    {leaves}, = leaves']
+    lines += [f'    {line}' for line in forward + backward]
+    returned_grads = ', '.join(f'g{i}' if i in grads else '0.0' for i in grad_ids)
+    lines.append(f'    return v{loss_id}, [{returned_grads}]')
+    return '\n'.join(lines) + '\n'
+
+
+def _forward_expression(graph, i, names):
+    opcode = graph.opcodes[i]
+    args = [names[c] for c in graph.children[graph.offsets[i]:graph.offsets[i + 1]]]
+    if opcode >= _DOT:
+        n = len(args) // 2  # children are (*weights, *inputs, bias)
+        z = ' + '.join([args[-1]] + [f'{w} * {x}' for w, x in zip(args[:n], args[n:-1])])
+        return _activation_expression(opcode, f'({z})')
+    if opcode == _ADD:
+        return f'{args[0]} + {args[1]}'
+    if opcode == _MUL:
+        return f'{args[0]} * {args[1]}'
+    if opcode == _SUB:
+        return f'{args[0]} - {args[1]}'
+    if opcode == _DIV:
+        return f'{args[0]} / {args[1]}'
+    if opcode == _POW:
+        return f'{args[0]} ** {args[1]}'
+    if opcode == _EXP:
+        return f'math.exp({args[0]})'
+    if opcode == _LOG:
+        return f'(math.log({args[0]}) if {args[0]} > 0 else -inf)'
+    return _activation_expression(opcode, args[0])
+
+
+def _activation_expression(opcode, z):
+    if opcode in (_TANH, _DOT_TANH):
+        return f'math.tanh({z})'
+    if opcode in (_RELU, _DOT_RELU):
+        return f'max(0, {z})'
+    if opcode in (_SIGMOID, _DOT_SIGMOID):
+        return f'1 / (1 + math.exp(-{z}))'
+    return z
+
+
+def _backward_expressions(graph, i, names):
+    """Return (child id, expression of the gradient contribution) pairs for node i"""
+    opcode = graph.opcodes[i]
+    children = graph.children[graph.offsets[i]:graph.offsets[i + 1]]
+    out, grad = f'v{i}', f'g{i}'
+    if opcode >= _DOT:
+        n = len(children) // 2
+        grad = f'd{i}'  # Derivative of the activation times g{i}
+        pairs = []
+        for w, x in zip(children[:n], children[n:-1]):
+            pairs += [(w, f'{names[x]} * {grad}'), (x, f'{names[w]} * {grad}')]
+        return pairs + [(children[-1], grad)]
+    if opcode == _ADD:
+        return [(children[0], grad), (children[1], grad)]
+    if opcode == _MUL:
+        a, b = children
+        return [(a, f'{names[b]} * {grad}'), (b, f'{names[a]} * {grad}')]
+    if opcode == _SUB:
+        return [(children[0], grad), (children[1], f'-{grad}')]
+    if opcode == _DIV:
+        a, b = children
+        return [(a, f'{grad} / {names[b]}'), (b, f'-{out} / {names[b]} * {grad}')]
+    if opcode == _POW:
+        base, exponent = (names[c] for c in children)
+        return [(children[0], f'{exponent} * {base} ** ({exponent} - 1) * {grad}'),
+                (children[1], f'({out} * math.log({base}) if {base} > 0 else 0) * {grad}')]
+    if opcode == _EXP:
+        return [(children[0], f'{out} * {grad}')]
+    if opcode == _LOG:
+        return [(children[0], f'{grad} / {names[children[0]]}')]
+    return [(children[0], f'{_derivative_expression(opcode, out)} * {grad}')]
+
+
+def _derivative_expression(opcode, out):
+    """Derivative of an activation in terms of its output"""
+    if opcode in (_TANH, _DOT_TANH):
+        return f'(1 - {out} * {out})'
+    if opcode in (_RELU, _DOT_RELU):
+        return f'({out} > 0)'
+    if opcode in (_SIGMOID, _DOT_SIGMOID):
+        return f'{out} * (1 - {out})'
+    return '1'
+
+
+def _literal(number):
+    if math.isinf(number):
+        return 'inf' if number > 0 else '(-inf)'
+    return f'({number!r})'
@@ -1,4 +1,5 @@
 from dlafs.array import ValueArray
+from dlafs.tensor import Tensor
 
 
 def mse(y_true, y_pred):
@@ -9,6 +10,8 @@ def mse(y_true, y_pred):
     MSE is defined as:
         mse = sum((y_j - pred_j)**2 for j in num_samples) / num_samples
     """
+    if isinstance(y_pred, Tensor):
+        return ((_coerce_tensor_target(y_true, y_pred) - y_pred) ** 2).mean()
     y_true, y_pred = _coerce_single_dim_args(y_true, y_pred)
     num_items = len(y_true)
     return sum((y_i.item() - pred_i.item())**2 for y_i, pred_i in zip(y_true, y_pred)) / num_items
@@ -37,8 +40,11 @@ def cross_entropy(y_true, y_pred):
     entropy variant.
 
     The inputs should be in the shape (num_samples, num_classes), 1D inputs are converted
-    to (1, num_classes).
+    to (1, num_classes), except for a Tensor, where they are a batch of binary predictions.
     """
+    if isinstance(y_pred, Tensor):
+        is_binary = y_pred.dim == 1 or y_pred.shape[1] == 1
+        return (binary_cross_entropy if is_binary else multi_cross_entropy)(y_true, y_pred)
     y_true, y_pred = _coerce_multi_dim_args(y_true, y_pred)
     if y_pred.shape[1] == 1:
         # Binary classification
@@ -57,6 +63,10 @@ def binary_cross_entropy(y_true, y_pred):
     The inputs should be in the shape (num_samples, 1). 1D inputs are converted to
     (num_samples, 1).
     """
+    if isinstance(y_pred, Tensor):
+        true = _coerce_tensor_target(y_true, y_pred)
+        sample_loss = (true * y_pred.log() + (1 - true) * (1 - y_pred).log()).clip(low=-100)
+        return -sample_loss.mean()
     y_true, y_pred = _coerce_single_dim_args(y_true, y_pred)
 
     loss = 0.0
@@ -79,6 +89,10 @@ def multi_cross_entropy(y_true, y_pred):
     The inputs should be in the shape (num_samples, num_classes). 1D inputs are converted to
     (1, num_classes).
     """
+    if isinstance(y_pred, Tensor):
+        true = _coerce_tensor_target(y_true, y_pred)
+        num_samples = len(y_pred) if y_pred.dim > 1 else 1
+        return -(true * (y_pred + 1e-50).log()).sum() / num_samples
     y_true, y_pred = _coerce_multi_dim_args(y_true, y_pred)
     loss = 0.0
     num_samples = len(y_true)
@@ -100,7 +114,7 @@ def _coerce_single_dim_args(y_true, y_pred):
     2. Add extra dim to single sample
     """
     if not isinstance(y_true, ValueArray):
-        y_true = ValueArray(y_true)
+        y_true = ValueArray(y_true, requires_grad=False)
     if y_true.dim < 1:
         y_true = [y_true.values]
         y_true = ValueArray(y_true)
@@ -121,7 +135,7 @@ def _coerce_multi_dim_args(y_true, y_pred):
     2. Add extra dim to single sample
     """
     if not isinstance(y_true, ValueArray):
-        y_true = ValueArray(y_true)
+        y_true = ValueArray(y_true, requires_grad=False)
     if y_true.dim < 2:
         y_true = [y_true.values]
         y_true = ValueArray(y_true)
@@ -133,3 +147,12 @@ def _coerce_multi_dim_args(y_true, y_pred):
         y_pred = ValueArray(y_pred)
 
     return y_true, y_pred
+
+
+def _coerce_tensor_target(y_true, y_pred):
+    """Convert the true values to a Tensor that doesn't require grad, shaped as y_pred"""
+    if isinstance(y_true, Tensor):
+        data = y_true.data
+    else:
+        data = ValueArray(y_true, requires_grad=False).to_numpy()
+    return Tensor(data.reshape(y_pred.shape), requires_grad=False)
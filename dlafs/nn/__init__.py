@@ -1,3 +1,6 @@
 from dlafs.nn.dnn import Neuron, Layer, VanillaNN
 from dlafs.nn.rnn import RecurrentNeuron, RecurrentLayer, RecurrentNN
-from dlafs.nn.common import BaseNeuron, Module
+from dlafs.nn.lstm import LSTMLayer, GRULayer
+from dlafs.nn.transformer import MultiHeadAttention, KVCache, LayerNorm, DecoderBlock
+from dlafs.nn.cnn import Conv1D, Conv2D, MaxPool1D, MaxPool2D, AvgPool1D, AvgPool2D, Flatten
+from dlafs.nn.common import BaseNeuron, BaseRecurrentLayer, Module
@@ -0,0 +1,215 @@
+import math
+
+from dlafs.autograd import Value
+from dlafs.array import ValueArray
+from dlafs.nn.common import Module, _format_activation_str
+
+
+class Conv1D(Module):
+    """A 1D convolution over a sequence of shape (length, in_channels).
+
+    Convolution is lowered to im2col: the inputs under the kernel at each position are
+    gathered into one patch, and every output is a single fused `Value.dot` of a kernel
+    row with its patch, with the activation fused in. That's one node per output element
+    rather than one per tile of outputs, which keeps convolutions compilable by dlafs.jit.
+    The kernels are stored as the rows of one (out_channels, kernel_size * in_channels)
+    matrix, in the order of the patch.
+    """
+
+    def __init__(self, in_channels, out_channels, kernel_size, stride=1, padding=0,
+                 activation='linear'):
+        self.in_channels = in_channels
+        self.out_channels = out_channels
+        self.kernel_size = kernel_size
+        self.stride = stride
+        self.padding = padding
+        self._activation = _format_activation_str(activation)
+        self.w, self.b = _init_kernels(out_channels, kernel_size * in_channels)
+
+    def __call__(self, x):
+        """The forward pass of a 1D convolution, returning shape (out_length, out_channels)"""
+        x = _as_channels_last(x, self.in_channels)
+        x = _pad(x, self.padding, self.in_channels)
+        patches = [
+            [v for x_t in x[i:i + self.kernel_size] for v in x_t]
+            for i in _window_starts(len(x), self.kernel_size, self.stride)
+        ]
+        return ValueArray([self._convolve(patch) for patch in patches])
+
+    def _convolve(self, patch):
+        return [Value.dot(w, patch, b, activation=self._activation)
+                for w, b in zip(self.w.values, self.b.values)]
+
+    def parameters(self):
+        """Return the kernels and biases as a list"""
+        return [w for row in self.w.values for w in row] + self.b.values
+
+    def __repr__(self):
+        return (f"{type(self).__name__}({self.in_channels}, {self.out_channels}, "
+                f"kernel_size={self.kernel_size}, '{self._activation}')")
+
+
+class Conv2D(Conv1D):
+    """A 2D convolution over an image of shape (height, width, in_channels).
+
+    Lowered to im2col as in Conv1D, the kernels are the rows of one (out_channels,
+    kernel_height * kernel_width * in_channels) matrix.
+    """
+
+    def __init__(self, in_channels, out_channels, kernel_size, stride=1, padding=0,
+                 activation='linear'):
+        self.in_channels = in_channels
+        self.out_channels = out_channels
+        self.kernel_size = _pair(kernel_size)
+        self.stride = _pair(stride)
+        self.padding = _pair(padding)
+        self._activation = _format_activation_str(activation)
+        kernel_height, kernel_width = self.kernel_size
+        self.w, self.b = _init_kernels(out_channels, kernel_height * kernel_width * in_channels)
+
+    def __call__(self, x):
+        """The forward pass of a 2D convolution, returning shape (out_height, out_width,
+        out_channels)"""
+        x = _as_channels_last(x, self.in_channels)
+        x = _pad_2d(x, self.padding, self.in_channels)
+        kernel_height, kernel_width = self.kernel_size
+        rows = _window_starts(len(x), kernel_height, self.stride[0])
+        columns = _window_starts(len(x[0]), kernel_width, self.stride[1])
+        return ValueArray([
+            [self._convolve([v for row in x[i:i + kernel_height]
+                             for pixel in row[j:j + kernel_width] for v in pixel])
+             for j in columns]
+            for i in rows
+        ])
+
+
+class BasePool1D(Module):
+    """Pooling over a sequence of shape (length, channels), for each channel.
+
+    Subclasses implement `_pool(window)`, reducing the Values of a window to one.
+    """
+
+    def __init__(self, kernel_size, stride=None):
+        self.kernel_size = kernel_size
+        self.stride = kernel_size if stride is None else stride
+
+    def __call__(self, x):
+        """The forward pass of 1D pooling, returning shape (out_length, channels)"""
+        x = ValueArray(x).values
+        return ValueArray([
+            [self._pool([x_t[c] for x_t in x[i:i + self.kernel_size]])
+             for c in range(len(x[0]))]
+            for i in _window_starts(len(x), self.kernel_size, self.stride)
+        ])
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.kernel_size})"
+
+
+class BasePool2D(BasePool1D):
+    """Pooling over an image of shape (height, width, channels), for each channel."""
+
+    def __init__(self, kernel_size, stride=None):
+        self.kernel_size = _pair(kernel_size)
+        self.stride = self.kernel_size if stride is None else _pair(stride)
+
+    def __call__(self, x):
+        """The forward pass of 2D pooling, returning shape (out_height, out_width, channels)"""
+        x = ValueArray(x).values
+        kernel_height, kernel_width = self.kernel_size
+        return ValueArray([
+            [[self._pool([pixel[c] for row in x[i:i + kernel_height]
+                          for pixel in row[j:j + kernel_width]])
+              for c in range(len(x[0][0]))]
+             for j in _window_starts(len(x[0]), kernel_width, self.stride[1])]
+            for i in _window_starts(len(x), kernel_height, self.stride[0])
+        ])
+
+
+class MaxPool1D(BasePool1D):
+    """Max pooling over a sequence of shape (length, channels), for each channel.
+
+    The maximum is the input Value itself, so pooling adds no nodes to the graph. Which
+    input that is depends on the data, so models with max pooling can't be compiled by
+    dlafs.jit.
+    """
+
+    _data_dependent = True
+
+    def _pool(self, window):
+        return max(window)
+
+
+class MaxPool2D(BasePool2D):
+    """Max pooling over an image of shape (height, width, channels), for each channel."""
+
+    _data_dependent = True
+
+    def _pool(self, window):
+        return max(window)
+
+
+class AvgPool1D(BasePool1D):
+    """Average pooling over a sequence of shape (length, channels), for each channel."""
+
+    def _pool(self, window):
+        return Value.dot([1 / len(window)] * len(window), window)
+
+
+class AvgPool2D(BasePool2D):
+    """Average pooling over an image of shape (height, width, channels), for each channel."""
+
+    def _pool(self, window):
+        return Value.dot([1 / len(window)] * len(window), window)
+
+
+class Flatten(Module):
+    """Flattens the input to one dimension, e.g. between convolutions and a Layer."""
+
+    def __call__(self, x):
+        return ValueArray(x).flatten()
+
+    def __repr__(self):
+        return "Flatten()"
+
+
+def _init_kernels(out_channels, fan_in):
+    """Initialize the kernels and biases uniformly within 1 / sqrt(fan_in), as in PyTorch"""
+    bound = 1 / math.sqrt(fan_in)
+    w = ValueArray.random_uniform((out_channels, fan_in), low=-bound, high=bound, label='w')
+    b = ValueArray.random_uniform((out_channels, ), low=-bound, high=bound, label='b')
+    return w, b
+
+
+def _as_channels_last(x, in_channels):
+    """Return x as a nested list of Values, checking its last dimension"""
+    x = ValueArray(x, requires_grad=False)
+    if not x.shape[-1] == in_channels:
+        raise ValueError(f'Expected {in_channels} input channels, got {x.shape[-1]}')
+    return x.values
+
+
+def _pad(x, padding, channels):
+    """Add `padding` zeros to each end of the sequence x"""
+    if not padding:
+        return x
+    zeros = [[Value(0, requires_grad=False) for _ in range(channels)] for _ in range(padding)]
+    return zeros + x + zeros
+
+
+def _pad_2d(x, padding, channels):
+    """Add zeros around the image x, `padding` is the (rows, columns) on each side"""
+    padding_rows, padding_columns = padding
+    x = [_pad(row, padding_columns, channels) for row in x]
+    if not padding_rows:
+        return x
+    zero_row = [[Value(0, requires_grad=False) for _ in range(channels)] for _ in x[0]]
+    return [zero_row] * padding_rows + x + [zero_row] * padding_rows
+
+
+def _window_starts(length, kernel_size, stride):
+    return range(0, length - kernel_size + 1, stride)
+
+
+def _pair(x):
+    return tuple(x) if isinstance(x, (tuple, list)) else (x, x)
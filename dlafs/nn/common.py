@@ -12,15 +12,38 @@ class Module:
 class BaseNeuron(Module):
 
     def activation(self, input):
-        if self._activation == 'Tanh':
-            out = input.tanh()
-        elif self._activation == 'ReLU':
-            out = input.relu()
-        elif self._activation == 'Sigmoid':
-            out = input.sigmoid()
-        else:
-            out = input
-        return out
+        return _apply_activation(input, self._activation)
+
+
+class BaseRecurrentLayer(Module):
+    """A layer running over a sequence, usable in RecurrentNN.
+
+    Subclasses implement `__call__(x, state=None)`, returning the hidden state of every
+    timestep of the sequence x. They override forward when their state is more than the
+    last hidden state, and batch when they can run several sequences together.
+    """
+
+    def forward(self, x, state=None):
+        """Return the hidden states for the sequence x and the state after its last timestep"""
+        a = self(x, state)
+        return a, a.values[-1]
+
+    def batch(self, sequences):
+        """Return the hidden states for each of the sequences"""
+        return [self(x) for x in sequences]
+
+
+def _apply_activation(input, activation):
+    """Apply the activation, formatted by _format_activation_str, to a Value or an array"""
+    if activation == 'Tanh':
+        out = input.tanh()
+    elif activation == 'ReLU':
+        out = input.relu()
+    elif activation == 'Sigmoid':
+        out = input.sigmoid()
+    else:
+        out = input
+    return out
 
 
 def _format_activation_str(activation):
@@ -1,7 +1,8 @@
 import random
 from dlafs.autograd import Value
 from dlafs.array import ValueArray
-from dlafs.nn.common import Module, BaseNeuron, _format_activation_str
+from dlafs.tensor import Tensor
+from dlafs.nn.common import Module, BaseNeuron, _apply_activation, _format_activation_str
 
 
 class Neuron(BaseNeuron):
@@ -18,12 +19,13 @@ class Neuron(BaseNeuron):
     def __call__(self, x):
         """The forward pass of a single neuron"""
         # Check that the number of inputs equals the number of weights
-        if len(x) != len(self.w):
-            raise ValueError(f'Expected {len(self.w)} inputs, got {len(x)}')
+        num_inputs = x.shape[-1] if isinstance(x, Tensor) else len(x)
+        if num_inputs != len(self.w):
+            raise ValueError(f'Expected {len(self.w)} inputs, got {num_inputs}')
 
-        z = sum((wi * xi for wi, xi in zip(self.w, x)), self.b)
-        out = self.activation(z)
-        return out
+        if isinstance(x, Tensor):  # A batch of inputs, or a single one
+            return self.activation(x @ Tensor.from_values(self.w) + Tensor.from_values([self.b]))
+        return Value.dot(self.w.values, x, self.b, activation=self._activation)
 
     def parameters(self):
         """Return the weights and bias as a list"""
@@ -36,22 +38,71 @@ class Neuron(BaseNeuron):
 
 class Layer(Module):
 
-    def __init__(self, num_inputs, num_outputs, activation='tanh'):
+    def __init__(self, num_inputs, num_outputs, activation='tanh', weight_matrix=False):
+        """Initialize a Neuron for each output, or with `weight_matrix`, the weights of
+        all of them as the rows of one (num_outputs, num_inputs) matrix.
+
+        A weight matrix is multiplied with the input by one Value.matmul node, and lets the
+        layer run over a batch of shape (batch_size, num_inputs). Both are initialized
+        alike, so the same seed gives the same parameters.
+        """
         self.num_inputs = num_inputs
         self.num_outputs = num_outputs
         self._activation = activation
-        self.neurons = [Neuron(num_inputs, activation) for _ in range(num_outputs)]
+        self.weight_matrix = weight_matrix
+        if weight_matrix:
+            rows, biases = [], []
+            for _ in range(num_outputs):  # Drawn in the order of the Neurons
+                rows.append([random.uniform(-1, 1) for _ in range(num_inputs)])
+                biases.append(random.uniform(-1, 1))
+            self.w = ValueArray(rows, label='w')
+            self.b = ValueArray(biases, label='b')
+        else:
+            self.neurons = [Neuron(num_inputs, activation) for _ in range(num_outputs)]
 
     def __call__(self, x):
         """The forward pass of a single layer"""
+        if isinstance(x, Tensor):
+            return self._tensor_forward(x)
+        if self.weight_matrix:
+            return self._matrix_forward(x)
         out = [n(x) for n in self.neurons]
         return out[0] if len(out) == 1 else ValueArray(out)
 
+    def _matrix_forward(self, x):
+        """The forward pass for an input, or a batch of them, with the weight matrix"""
+        x = ValueArray(x, requires_grad=False)
+        if not x.shape[-1] == self.num_inputs:
+            raise ValueError(f'Expected {self.num_inputs} inputs, got {x.shape[-1]}')
+        out = _apply_activation(x @ self.w.T + self.b, _format_activation_str(self._activation))
+        if self.num_outputs == 1:  # A single Value per input, as with the Neurons
+            return out.item() if x.dim == 1 else out[:, 0]
+        return out
+
+    def _tensor_forward(self, x):
+        """The forward pass for a Tensor with an input in its last dimension, e.g. a batch.
+
+        The weights of all neurons are gathered into one Tensor, so the whole layer is one
+        matrix product.
+        """
+        if self.weight_matrix:
+            w, b = Tensor.from_values(self.w), Tensor.from_values(self.b)
+        else:
+            w = Tensor.from_values([n.w.values for n in self.neurons])
+            b = Tensor.from_values([n.b for n in self.neurons])
+        out = _apply_activation(x @ w.T + b, _format_activation_str(self._activation))
+        return out.reshape(out.shape[:-1]) if self.num_outputs == 1 else out
+
     def parameters(self):
         """Return the weights and bias of the whole layer as a list"""
+        if self.weight_matrix:
+            return [p for row, b in zip(self.w, self.b) for p in (*row, b)]
         return [p for n in self.neurons for p in n.parameters()]
 
     def __repr__(self):
+        if self.weight_matrix:
+            return (f"Layer('{self._activation}', {self.num_inputs}, {self.num_outputs}, "
+                    f"weight_matrix=True)")
         neuron_type = str(self.neurons[0]).split('(')[0]
         return (f"Layer({neuron_type}('{self._activation}'), "
                 f"{self.num_inputs}, {self.num_outputs})")
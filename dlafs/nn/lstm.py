@@ -0,0 +1,140 @@
+import math
+
+from dlafs.autograd import Value
+from dlafs.array import ValueArray
+from dlafs.nn.common import BaseRecurrentLayer
+
+
+class LSTMLayer(BaseRecurrentLayer):
+    """A long short-term memory layer.
+
+    The input, forget, cell and output gates (in that order, as in PyTorch) of all units
+    are rows of one weight matrix over the input and hidden state. A timestep takes one
+    `Value.dot` per gate unit, with the gate's activation fused in, and one for the cell
+    update `f * c + i * g`, instead of a node for every product, sum and activation.
+    """
+
+    def __init__(self, num_inputs, hidden_size):
+        self.num_inputs = num_inputs
+        self.hidden_size = hidden_size
+        bound = 1 / math.sqrt(hidden_size)
+        self.w = ValueArray.random_uniform((4 * hidden_size, num_inputs + hidden_size),
+                                           low=-bound, high=bound, label='w')
+        self.b = ValueArray.random_uniform((4 * hidden_size, ), low=-bound, high=bound,
+                                           label='b')
+
+    def __call__(self, x, state=None):
+        """The forward pass of a LSTM layer, see forward for `state`"""
+        return self.forward(x, state)[0]
+
+    def forward(self, x, state=None):
+        """Return the hidden states for the sequence x and the state (h, c) after it.
+
+        The state is the hidden and cell state, both zeros by default.
+        """
+        x = _as_sequence(x, self.num_inputs)
+        h, c = _initial_state(state, self.hidden_size, 2)
+        rows, bias = self.w.values, self.b.values
+        units = range(self.hidden_size)
+
+        a = []
+        for x_t in x:
+            inputs = x_t + h
+            i, f, g, o = (
+                [Value.dot(rows[k], inputs, bias[k], activation) for k in _gate_rows(gate, units)]
+                for gate, activation in enumerate(('sigmoid', 'sigmoid', 'tanh', 'sigmoid'))
+            )
+            c = [Value.dot([f[j], i[j]], [c[j], g[j]]) for j in units]
+            h = [o[j] * c[j].tanh() for j in units]
+            a.append(h)
+        return ValueArray(a), (h, c)
+
+    def parameters(self):
+        """Return the weights and biases as a list"""
+        return [w for row in self.w.values for w in row] + self.b.values
+
+    def __repr__(self):
+        return f"LSTMLayer({self.num_inputs}, {self.hidden_size})"
+
+
+class GRULayer(BaseRecurrentLayer):
+    """A gated recurrent unit layer.
+
+    The reset, update and new gates (in that order, as in PyTorch) of all units are rows of
+    one weight matrix over the input and hidden state. As in PyTorch, the reset gate only
+    applies to the hidden part of the new gate, which has its own bias `b_hn` for it.
+    """
+
+    def __init__(self, num_inputs, hidden_size):
+        self.num_inputs = num_inputs
+        self.hidden_size = hidden_size
+        bound = 1 / math.sqrt(hidden_size)
+        self.w = ValueArray.random_uniform((3 * hidden_size, num_inputs + hidden_size),
+                                           low=-bound, high=bound, label='w')
+        self.b = ValueArray.random_uniform((3 * hidden_size, ), low=-bound, high=bound,
+                                           label='b')
+        self.b_hn = ValueArray.random_uniform((hidden_size, ), low=-bound, high=bound,
+                                              label='b_hn')
+
+    def __call__(self, x, state=None):
+        """The forward pass of a GRU layer, starting from the hidden state `state`"""
+        return self.forward(x, state)[0]
+
+    def forward(self, x, state=None):
+        """Return the hidden states for the sequence x and the hidden state after it.
+
+        The state is the hidden state, zeros by default.
+        """
+        x = _as_sequence(x, self.num_inputs)
+        h, = _initial_state(None if state is None else (state, ), self.hidden_size, 1)
+        rows, bias, b_hn = self.w.values, self.b.values, self.b_hn.values
+        n_x = self.num_inputs
+        units = range(self.hidden_size)
+
+        a = []
+        for x_t in x:
+            inputs = x_t + h
+            r, z = (
+                [Value.dot(rows[k], inputs, bias[k], 'sigmoid') for k in _gate_rows(gate, units)]
+                for gate in range(2)
+            )
+            n = []
+            for j, k in zip(units, _gate_rows(2, units)):
+                n_input = Value.dot(rows[k][:n_x], x_t, bias[k])
+                n_hidden = Value.dot(rows[k][n_x:], h, b_hn[j])
+                n.append(Value.dot([n_input, r[j]], [1, n_hidden], activation='tanh'))
+            h = [Value.dot([1 - z[j], z[j]], [n[j], h[j]]) for j in units]
+            a.append(h)
+        return ValueArray(a), h
+
+    def parameters(self):
+        """Return the weights and biases as a list"""
+        return [w for row in self.w.values for w in row] + self.b.values + self.b_hn.values
+
+    def __repr__(self):
+        return f"GRULayer({self.num_inputs}, {self.hidden_size})"
+
+
+def _as_sequence(x, num_inputs):
+    """Return the sequence x as a list of timesteps, each a list of Values"""
+    x = ValueArray(x, requires_grad=False)
+    if not x.shape[1] == num_inputs:
+        raise ValueError(f'Expected {num_inputs} inputs, got {x.shape[1]}')
+    return x.values
+
+
+def _initial_state(state, hidden_size, num_states):
+    """Return the given state as lists of Values, or zeros if state is None"""
+    if state is None:
+        return [ValueArray.zeros(shape=(hidden_size, ), requires_grad=False).values
+                for _ in range(num_states)]
+    state = [ValueArray(s, requires_grad=False) for s in state]
+    for s in state:
+        if not s.shape == (hidden_size, ):
+            raise ValueError(f'Expected {hidden_size} hidden inputs, got {s.shape}')
+    return [s.values for s in state]
+
+
+def _gate_rows(gate, units):
+    """Return the rows of the weight matrix for the units of a gate"""
+    return range(gate * len(units), (gate + 1) * len(units))
@@ -1,6 +1,8 @@
-from dlafs.autograd import Value
+from functools import partial
+
+from dlafs.autograd import Value, checkpoint, no_grad
 from dlafs.array import ValueArray
-from dlafs.nn.common import Module, BaseNeuron, _format_activation_str
+from dlafs.nn.common import Module, BaseNeuron, BaseRecurrentLayer, _format_activation_str
 
 
 class RecurrentNeuron(BaseNeuron):
@@ -25,12 +27,9 @@ class RecurrentNeuron(BaseNeuron):
             raise ValueError(f'Expected {self.wa.shape[0]} hidden inputs, got {len(a)}')
         a = ValueArray(a, label='a')
 
-        zx = sum(wx_i * x_i for wx_i, x_i in zip(self.wx, x))
-        za = sum(wa_i * a_i for wa_i, a_i in zip(self.wa, a))
-        z = zx + za + self.ba
-
-        out = self.activation(z)
-        return out
+        weights = self.wx.values + self.wa.values
+        inputs = list(x) + a.values
+        return Value.dot(weights, inputs, self.ba, activation=self._activation)
 
     def parameters(self):
         """Return the weights and bias as a list"""
@@ -41,31 +40,105 @@ class RecurrentNeuron(BaseNeuron):
         return f"RecurrentNeuron({num_inputs}, '{self._activation}')"
 
 
-class RecurrentLayer(Module):
+class RecurrentLayer(BaseRecurrentLayer):
 
-    def __init__(self, num_inputs, hidden_size, activation='tanh'):
+    def __init__(self, num_inputs, hidden_size, activation='tanh', checkpoint_every=None):
+        """Set `checkpoint_every` to k to only keep the hidden states for backward, and
+        recompute the graph of each segment of k timesteps during backward instead.
+        """
         self.num_inputs = num_inputs
         self.hidden_size = hidden_size
+        self.checkpoint_every = checkpoint_every
         self._activation = activation
         self.neurons = [
             RecurrentNeuron(num_inputs, hidden_size, activation, neuron_id=i)
             for i in range(hidden_size)
         ]
 
-    def __call__(self, x):
-        """The forward pass of a single recurrent layer"""
-        x = ValueArray(x)
+    def __call__(self, x, a_0=None):
+        """The forward pass of a single recurrent layer, starting from the hidden state a_0.
+
+        a_0 defaults to zeros. Numbers start a new graph, while Values from an earlier call
+        connect it, so backward goes through both calls.
+        """
+        x = ValueArray(x, requires_grad=False)
         # Check that the number of inputs equals the number of weights
         if not x.shape[1] == self.neurons[0].wx.shape[0]:
             raise ValueError(f'Expected {self.neurons[0].wx.shape[0]} inputs, got {x.shape[1]}')
 
-        # Initialize hidden state to zeros
-        a_t = ValueArray.zeros(shape=(self.hidden_size,), label='a_t')
+        if a_0 is None:  # Initialize hidden state to zeros
+            a_t = ValueArray.zeros(shape=(self.hidden_size,), label='a_t', requires_grad=False)
+        else:
+            a_t = ValueArray(a_0, requires_grad=False)
+            if not a_t.shape == (self.hidden_size, ):
+                raise ValueError(f'Expected {self.hidden_size} hidden inputs, got {a_t.shape}')
+        if not self.checkpoint_every:
+            a = self._unroll(x, a_t.values)
+        else:
+            a = []
+            parameters = self.parameters()
+            for start in range(0, len(x), self.checkpoint_every):
+                segment = x[start:start + self.checkpoint_every]
+                # The timesteps are inputs too, so backward reaches whatever produced them
+                inputs = [v for x_t in segment for v in x_t] + list(a_t)
+                a.extend(checkpoint(partial(self._unroll_inputs, len(segment)), inputs,
+                                    parameters))
+                a_t = a[-self.hidden_size:]
+        return ValueArray([a[i:i + self.hidden_size] for i in range(0, len(a), self.hidden_size)])
+
+    def batch(self, sequences):
+        """Run the layer over a batch of sequences, returning the output for each of them.
+
+        The sequences advance one timestep together, with the weights of each neuron read
+        once per timestep for the whole batch. They are padded to the longest sequence, and
+        its padding mask leaves out the timesteps past the end of the shorter ones. The
+        batch keeps the whole graph, `checkpoint_every` isn't used.
+        """
+        sequences = [ValueArray(x, requires_grad=False).values for x in sequences]
+        for x in sequences:
+            if not len(x[0]) == self.num_inputs:
+                raise ValueError(f'Expected {self.num_inputs} inputs, got {len(x[0])}')
+
+        a = [ValueArray.zeros(shape=(self.hidden_size,), requires_grad=False).values
+             for _ in sequences]
+        outputs = [[] for _ in sequences]
+        for t, mask_t in enumerate(_padding_mask([len(x) for x in sequences])):
+            active = [b for b, is_step in enumerate(mask_t) if is_step]
+            inputs = [sequences[b][t] + a[b] for b in active]
+            a_t = [[] for _ in active]
+            for n in self.neurons:
+                weights = n.wx.values + n.wa.values
+                for a_tb, inputs_b in zip(a_t, inputs):
+                    a_tb.append(Value.dot(weights, inputs_b, n.ba, activation=n._activation))
+            for b, a_tb in zip(active, a_t):
+                a[b] = a_tb
+                outputs[b].append(a_tb)
+        return [ValueArray(out) for out in outputs]
+
+    def step(self, x_t, a_t=None):
+        """Return the hidden state after the timestep x_t, from the hidden state a_t.
+
+        Runs under no_grad, for feeding a live sequence one timestep at a time at a constant
+        cost, instead of calling the layer again with the whole sequence.
+        """
+        with no_grad():
+            return self([x_t], a_t).values[0]
+
+    def _unroll(self, x, a_t):
+        """Run the timesteps of x from the hidden state a_t, returning all the hidden states
+        after each other in one list"""
         a = []
         for x_t in x:
             a_t = [n(x_t, a_t) for n in self.neurons]
-            a.append(a_t)
-        return ValueArray(a)
+            a.extend(a_t)
+        return a
+
+    def _unroll_inputs(self, num_steps, inputs):
+        """_unroll for checkpoint, with the timesteps followed by the hidden state in one
+        flat list of inputs"""
+        n = self.num_inputs
+        x = [inputs[t * n:(t + 1) * n] for t in range(num_steps)]
+        return self._unroll(x, inputs[num_steps * n:])
 
     def parameters(self):
         """Return the weights and bias as a list"""
@@ -82,18 +155,70 @@ class RecurrentNN(Module):
     def __init__(self, layers):
         self.layers = layers
 
-    def __call__(self, x):
-        """The forward pass of a recurrent NN."""
-        x = ValueArray(x)
+    def __call__(self, x, state=None):
+        """The forward pass of a recurrent NN, see forward for `state`."""
+        return self.forward(x, state)[0]
+
+    def forward(self, x, state=None):
+        """Return the output for the sequence x and the state after its last timestep.
+
+        The state has the state of each recurrent layer, e.g. the last hidden state of a
+        RecurrentLayer. Passing it back continues the sequence where it stopped, all zeros
+        are used by default.
+        """
+        x = ValueArray(x, requires_grad=False)
+        state = list(state) if state is not None else [None] * len(self._recurrent_layers())
+        new_state = []
         for layer in self.layers:
-            if x.dim > 1 and not isinstance(layer, RecurrentLayer):
+            if isinstance(layer, BaseRecurrentLayer):
+                x, layer_state = layer.forward(x, state[len(new_state)])
+                new_state.append(layer_state)
+            elif x.dim > 1:
                 new_x = []
                 for x_t in x:
                     new_x.append(layer(x_t))
                 x = ValueArray(new_x)
             else:
                 x = layer(x)
-        return x
+        return x, new_state
+
+    def batch(self, sequences, batch_size=None):
+        """Return the output for each of the sequences, see RecurrentLayer.batch.
+
+        With a `batch_size`, the sequences are bucketed by length into batches of that size,
+        so sequences of similar length are padded together.
+        """
+        sequences = list(sequences)
+        if batch_size is None:
+            batch_size = len(sequences)
+        outputs = [None] * len(sequences)
+        for indices in _bucket_by_length([len(x) for x in sequences], batch_size):
+            x = [sequences[i] for i in indices]
+            for layer in self.layers:
+                if isinstance(layer, BaseRecurrentLayer):
+                    x = layer.batch(x)
+                else:
+                    x = [ValueArray([layer(x_t) for x_t in x_b]) for x_b in x]
+            for i, output in zip(indices, x):
+                outputs[i] = output
+        return outputs
+
+    def step(self, x_t, state=None):
+        """Return the output for the timestep x_t and the state after it.
+
+        Runs under no_grad, for feeding a live sequence one timestep at a time at a constant
+        cost, passing the returned state to the next call:
+
+            state = None
+            for x_t in stream:
+                y_t, state = model.step(x_t, state)
+        """
+        with no_grad():
+            output, state = self.forward([x_t], state)
+        return output[0], state
+
+    def _recurrent_layers(self):
+        return [layer for layer in self.layers if isinstance(layer, BaseRecurrentLayer)]
 
     def parameters(self):
         return [p for layer in self.layers for p in layer.parameters()]
@@ -101,3 +226,14 @@ class RecurrentNN(Module):
     def __repr__(self):
         layers_str = ',\n  '.join([str(layer) for layer in self.layers])
         return f"RecurrentNN([\n  {layers_str}\n])"
+
+
+def _padding_mask(lengths):
+    """Return a mask with a row per timestep, True for the sequences still running"""
+    return [[t < length for length in lengths] for t in range(max(lengths))]
+
+
+def _bucket_by_length(lengths, batch_size):
+    """Group the indices of the sequences into batches of sequences with similar lengths"""
+    order = sorted(range(len(lengths)), key=lengths.__getitem__)
+    return [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
@@ -0,0 +1,143 @@
+import math
+
+from dlafs.autograd import Value
+from dlafs.array import ValueArray
+from dlafs.nn.common import Module
+from dlafs.nn.dnn import Layer, VanillaNN
+
+
+class KVCache:
+    """The keys and values of the tokens a MultiHeadAttention has seen so far.
+
+    Passing the same cache to every call lets autoregressive generation feed only the
+    newest token, instead of recomputing the projections and attention of all the earlier
+    tokens for every new one.
+    """
+
+    def __init__(self):
+        self.keys = []
+        self.values = []
+
+    def __len__(self):
+        return len(self.keys)
+
+
+class MultiHeadAttention(Module):
+    """Causal multi-head self-attention over a sequence of shape (length, embed_dim).
+
+    Each token attends to itself and the tokens before it, with the fused softmax attention
+    of `Value.attention` for each head.
+    """
+
+    def __init__(self, embed_dim, num_heads):
+        if embed_dim % num_heads:
+            raise ValueError(f'embed_dim must be divisible by num_heads, got {embed_dim} '
+                             f'and {num_heads}')
+        self.embed_dim = embed_dim
+        self.num_heads = num_heads
+        self.query = Layer(embed_dim, embed_dim, activation='linear')
+        self.key = Layer(embed_dim, embed_dim, activation='linear')
+        self.value = Layer(embed_dim, embed_dim, activation='linear')
+        self.output = Layer(embed_dim, embed_dim, activation='linear')
+
+    def __call__(self, x, cache=None):
+        """The forward pass of multi-head attention, for the tokens following the cache.
+
+        The keys and values of x are added to the cache, and x attends to them and the
+        ones already in it. Without a cache, x is a whole sequence.
+        """
+        x = ValueArray(x, requires_grad=False).values
+        cache = KVCache() if cache is None else cache
+        start = len(cache)
+        queries = []
+        for x_t in x:
+            queries.append(_vector(self.query(x_t)))
+            cache.keys.append(_vector(self.key(x_t)))
+            cache.values.append(_vector(self.value(x_t)))
+
+        head_size = self.embed_dim // self.num_heads
+        scale = 1 / math.sqrt(head_size)
+        out = []
+        for position, query in enumerate(queries, start=start + 1):
+            keys, values = cache.keys[:position], cache.values[:position]
+            heads = []
+            for h in range(0, self.embed_dim, head_size):
+                heads.extend(Value.attention(query[h:h + head_size],
+                                             [k[h:h + head_size] for k in keys],
+                                             [v[h:h + head_size] for v in values], scale))
+            out.append(_vector(self.output(heads)))
+        return ValueArray(out)
+
+    def parameters(self):
+        """Return the weights and biases of the projections as a list"""
+        return [p for layer in (self.query, self.key, self.value, self.output)
+                for p in layer.parameters()]
+
+    def __repr__(self):
+        return f"MultiHeadAttention({self.embed_dim}, num_heads={self.num_heads})"
+
+
+class LayerNorm(Module):
+    """Normalizes a vector to zero mean and unit variance, then scales and shifts it."""
+
+    def __init__(self, size, eps=1e-5):
+        self.size = size
+        self.eps = eps
+        self.gamma = ValueArray([1.0] * size, label='gamma')
+        self.beta = ValueArray.zeros((size, ), label='beta')
+
+    def __call__(self, x):
+        """The forward pass of layer normalization of a single vector"""
+        x = list(x)
+        n = len(x)
+        mean = Value.dot([1 / n] * n, x)
+        centered = [x_i - mean for x_i in x]
+        inv_std = (Value.dot(centered, centered) * (1 / n) + self.eps) ** -0.5
+        return ValueArray([Value.dot([c * inv_std], [gamma], beta)
+                           for c, gamma, beta in zip(centered, self.gamma, self.beta)])
+
+    def parameters(self):
+        """Return the scale and shift as a list"""
+        return self.gamma.values + self.beta.values
+
+    def __repr__(self):
+        return f"LayerNorm({self.size})"
+
+
+class DecoderBlock(Module):
+    """A pre-norm transformer decoder block, of causal self-attention and an MLP.
+
+    Both sublayers are applied to the normalized input of the block and added back to it:
+
+        x = x + attention(norm_1(x))
+        x = x + mlp(norm_2(x))
+    """
+
+    def __init__(self, embed_dim, num_heads, hidden_size):
+        self.norm_1 = LayerNorm(embed_dim)
+        self.attention = MultiHeadAttention(embed_dim, num_heads)
+        self.norm_2 = LayerNorm(embed_dim)
+        self.mlp = VanillaNN([
+            Layer(embed_dim, hidden_size, activation='relu'),
+            Layer(hidden_size, embed_dim, activation='linear'),
+        ])
+
+    def __call__(self, x, cache=None):
+        """The forward pass of the block, see MultiHeadAttention for the cache"""
+        x = ValueArray(x, requires_grad=False)
+        x = x + self.attention([self.norm_1(x_t).values for x_t in x], cache)
+        return ValueArray([x_t + _vector(self.mlp(self.norm_2(x_t))) for x_t in x])
+
+    def parameters(self):
+        """Return the parameters of the norms, attention and MLP as a list"""
+        return [p for module in (self.norm_1, self.attention, self.norm_2, self.mlp)
+                for p in module.parameters()]
+
+    def __repr__(self):
+        return (f"DecoderBlock({self.attention.embed_dim}, "
+                f"num_heads={self.attention.num_heads})")
+
+
+def _vector(out):
+    """Return the output of a Layer as a list, a single Value included"""
+    return out.values if isinstance(out, ValueArray) else [out]
@@ -0,0 +1,371 @@
+from functools import partial
+from numbers import Number
+
+import numpy as np
+
+from dlafs import autograd
+from dlafs.autograd import _ACTIVATIONS
+from dlafs.array import ValueArray, _create_random_normal_data, _create_random_uniform_data
+
+
+class Tensor:
+    """An array node in the computational graph, with a numpy array for data and grad.
+
+    Every operation works on the whole array at once and is recorded as one node, so the
+    per-element work is done by numpy instead of by Python-level loops over Values. As for
+    Value, the operator names the gradient rule in `_BACKWARD`, with any extra
+    information it needs (e.g. the axis of a sum) in `_context`.
+    """
+
+    __slots__ = ('data', 'grad', 'label', 'requires_grad', '_children', '_operator',
+                 '_context')
+
+    def __init__(self, data, label='', requires_grad=True):
+        """Create a leaf node from an array or a (nested) list of numbers"""
+        self.data = np.array(data, dtype=np.float64)
+        self.grad = np.zeros_like(self.data)
+        self.label = label
+        self.requires_grad = requires_grad
+        self._children = ()
+        self._operator = ''
+        self._context = None
+
+    @classmethod
+    def zeros(cls, shape, label='', requires_grad=True):
+        """Create a Tensor of zeros"""
+        return cls(np.zeros(shape), label, requires_grad)
+
+    @classmethod
+    def random_normal(cls, shape, label='', mean=0, std=1, requires_grad=True):
+        """Create a Tensor of random values from a normal distribution, drawn as in ValueArray"""
+        return cls(_create_random_normal_data(shape, mean, std), label, requires_grad)
+
+    @classmethod
+    def random_uniform(cls, shape, label='', low=0, high=1, requires_grad=True):
+        """Create a Tensor of random values from a uniform dist between low and high, drawn
+        as in ValueArray"""
+        return cls(_create_random_uniform_data(shape, low, high), label, requires_grad)
+
+    @classmethod
+    def from_numpy(cls, data, label='', requires_grad=True):
+        """Create a Tensor from a numpy array"""
+        return cls(data, label, requires_grad)
+
+    @classmethod
+    def from_values(cls, values):
+        """Create a Tensor from a (nested) list of Values, e.g. the weights of a Layer.
+
+        Backward adds the gradient of the Tensor to the grad of each Value. The Values are
+        treated as leaves, their own graph isn't backpropagated through.
+        """
+        values = ValueArray(values)
+        flat = list(values.flatten())
+        data = np.array([v.data for v in flat], dtype=np.float64).reshape(values.shape)
+        return cls._from_operation(data, (), 'values', flat,
+                                   requires_grad=any(v.requires_grad for v in flat))
+
+    def to_numpy(self):
+        """Return a copy of the data as a numpy array"""
+        return self.data.copy()
+
+    def to_list(self):
+        """Convert the Tensor to a nested list"""
+        return self.data.tolist()
+
+    def item(self):
+        """Return the value of a Tensor with one element as a float"""
+        return self.data.item()
+
+    @property
+    def shape(self):
+        return self.data.shape
+
+    @property
+    def dim(self):
+        return self.data.ndim
+
+    def __len__(self):
+        return len(self.data)
+
+    @classmethod
+    def _from_operation(cls, data, children, operator, context=None, requires_grad=None):
+        """Create new object from an operation, see Value._from_operation"""
+        out = cls.__new__(cls)
+        out.data = data
+        out.grad = np.zeros_like(data)
+        out.label = ''
+        out.requires_grad = False
+        out._children = ()
+        out._operator = ''
+        out._context = None
+        if requires_grad is None:
+            requires_grad = any(child.requires_grad for child in children)
+        if not autograd._grad_enabled or not requires_grad:
+            return out
+        out.requires_grad = True
+        out._children = tuple(children)
+        out._operator = operator
+        out._context = context
+        return out
+
+    def __add__(self, other):
+        other = _as_tensor(other)
+        return Tensor._from_operation(self.data + other.data, (self, other), '+')
+
+    def __mul__(self, other):
+        other = _as_tensor(other)
+        return Tensor._from_operation(self.data * other.data, (self, other), '*')
+
+    def __pow__(self, other):
+        if not isinstance(other, Number):
+            raise TypeError("Only supporting int/float powers for now")
+        return Tensor._from_operation(self.data ** other, (self, ), '**', other)
+
+    def __matmul__(self, other):
+        other = _as_tensor(other)
+        return Tensor._from_operation(self.data @ other.data, (self, other), '@')
+
+    def __rmatmul__(self, other):
+        return _as_tensor(other) @ self
+
+    def __neg__(self):
+        return self * -1
+
+    def __sub__(self, other):
+        return self + (-other)
+
+    def __truediv__(self, other):
+        if isinstance(other, Number):
+            return self * (1 / other)
+        return self * _as_tensor(other) ** -1
+
+    def __radd__(self, other):
+        return self + other
+
+    def __rsub__(self, other):
+        return other + (-self)
+
+    def __rmul__(self, other):
+        return self * other
+
+    def __rtruediv__(self, other):
+        return other * self**-1
+
+    def __getitem__(self, index):
+        return Tensor._from_operation(self.data[index], (self, ), 'getitem', index)
+
+    def exp(self):
+        return Tensor._from_operation(np.exp(self.data), (self, ), 'exp')
+
+    def log(self):
+        with np.errstate(divide='ignore'):  # log(0) is -inf, as for Value
+            return Tensor._from_operation(np.log(self.data), (self, ), 'log')
+
+    def tanh(self):
+        return Tensor._from_operation(np.tanh(self.data), (self, ), 'tanh')
+
+    def relu(self):
+        return Tensor._from_operation(np.maximum(self.data, 0), (self, ), 'ReLU')
+
+    def sigmoid(self):
+        return Tensor._from_operation(1 / (1 + np.exp(-self.data)), (self, ), 'sigmoid')
+
+    def clip(self, low=None, high=None):
+        """Limit the data to [low, high], the gradient doesn't flow to the clipped elements"""
+        return Tensor._from_operation(np.clip(self.data, low, high), (self, ), 'clip',
+                                      (low, high))
+
+    def sum(self, axis=None):
+        return Tensor._from_operation(self.data.sum(axis=axis), (self, ), 'sum', axis)
+
+    def mean(self, axis=None):
+        axes = range(self.data.ndim) if axis is None else np.atleast_1d(axis)
+        count = int(np.prod([self.data.shape[a] for a in axes]))
+        return self.sum(axis) * (1 / count)
+
+    def reshape(self, *shape):
+        shape = shape[0] if len(shape) == 1 and isinstance(shape[0], tuple) else shape
+        return Tensor._from_operation(self.data.reshape(shape), (self, ), 'reshape')
+
+    @property
+    def T(self):
+        return Tensor._from_operation(self.data.T, (self, ), 'transpose')
+
+    def backward(self, retain_graph=False):
+        """Backpropagate the gradient of self to every node in its graph.
+
+        Unless `retain_graph` is set, each node drops its children once processed, see
+        Value.backward.
+        """
+        _check_not_freed(self)
+        topo = self.topological_sort()
+        for node in topo:  # Reset intermediate grads so repeated calls don't accumulate
+            if node._operator:
+                node.grad = np.zeros_like(node.data)
+        self.grad = np.ones_like(self.data)
+        for node in reversed(topo):
+            if node._operator:
+                _BACKWARD[node._operator](node)
+                if not retain_graph:
+                    node._children = ()
+
+    def topological_sort(self):
+        """Return every node in the graph of self, ordered so children come before parents"""
+        topo = []
+        visited = {id(self)}
+        stack = [(self, iter(self._children))]
+        while stack:
+            node, children = stack[-1]
+            for child in children:
+                if child.requires_grad and id(child) not in visited:
+                    _check_not_freed(child)
+                    visited.add(id(child))
+                    stack.append((child, iter(child._children)))
+                    break
+            else:
+                stack.pop()
+                topo.append(node)
+        return topo
+
+    def __repr__(self):
+        data = np.array2string(self.data, precision=4, separator=', ')
+        return f"Tensor({data}, shape={self.shape})"
+
+    def __hash__(self):
+        return hash(id(self))
+
+
+def _as_tensor(x):
+    """Return x as a Tensor, numbers and arrays become constants that don't require grad."""
+    return x if isinstance(x, Tensor) else Tensor(x, requires_grad=False)
+
+
+def _unbroadcast(grad, shape):
+    """Sum the gradient of a broadcast operand over the dimensions it was broadcast along"""
+    while grad.ndim > len(shape):
+        grad = grad.sum(axis=0)
+    for axis, size in enumerate(shape):
+        if size == 1 and grad.shape[axis] != 1:
+            grad = grad.sum(axis=axis, keepdims=True)
+    return grad
+
+
+# Gradient rules, indexed by operator, see autograd._BACKWARD
+
+def _add_backward(out):
+    a, b = out._children
+    if a.requires_grad:
+        a.grad += _unbroadcast(out.grad, a.shape)
+    if b.requires_grad:
+        b.grad += _unbroadcast(out.grad, b.shape)
+
+
+def _mul_backward(out):
+    a, b = out._children
+    if a.requires_grad:
+        a.grad += _unbroadcast(b.data * out.grad, a.shape)
+    if b.requires_grad:
+        b.grad += _unbroadcast(a.data * out.grad, b.shape)
+
+
+def _pow_backward(out):
+    base, = out._children
+    exponent = out._context
+    base.grad += exponent * base.data**(exponent - 1) * out.grad
+
+
+def _matmul_backward(out):
+    a, b = out._children
+    # Treat vectors as matrices of one row (a) or column (b), as numpy does, and sum the
+    # gradient over the batch dimensions an operand was broadcast along
+    a_data = a.data[np.newaxis] if a.dim == 1 else a.data
+    b_data = b.data[:, np.newaxis] if b.dim == 1 else b.data
+    grad = out.grad
+    if a.dim == 1:
+        grad = np.expand_dims(grad, -2)
+    if b.dim == 1:
+        grad = np.expand_dims(grad, -1)
+    if a.requires_grad:
+        a_grad = grad @ np.swapaxes(b_data, -1, -2)
+        a.grad += _unbroadcast(a_grad, a_data.shape).reshape(a.shape)
+    if b.requires_grad:
+        b_grad = np.swapaxes(a_data, -1, -2) @ grad
+        b.grad += _unbroadcast(b_grad, b_data.shape).reshape(b.shape)
+
+
+def _exp_backward(out):
+    x, = out._children
+    x.grad += out.data * out.grad
+
+
+def _log_backward(out):
+    x, = out._children
+    x.grad += out.grad / x.data
+
+
+def _activation_backward(derivative, out):
+    x, = out._children
+    x.grad += derivative(out.data) * out.grad
+
+
+def _clip_backward(out):
+    x, = out._children
+    low, high = out._context
+    mask = np.ones_like(x.data, dtype=bool)
+    if low is not None:
+        mask &= x.data >= low
+    if high is not None:
+        mask &= x.data <= high
+    x.grad += mask * out.grad
+
+
+def _check_not_freed(node):
+    """Raise as autograd does, a 'values' node has no children even before backward"""
+    if node._operator != 'values':
+        autograd._check_not_freed(node)
+
+
+def _sum_backward(out):
+    x, = out._children
+    grad = out.grad if out._context is None else np.expand_dims(out.grad, out._context)
+    x.grad += np.broadcast_to(grad, x.shape)
+
+
+def _getitem_backward(out):
+    x, = out._children
+    np.add.at(x.grad, out._context, out.grad)
+
+
+def _reshape_backward(out):
+    x, = out._children
+    x.grad += out.grad.reshape(x.shape)
+
+
+def _transpose_backward(out):
+    x, = out._children
+    x.grad += out.grad.T
+
+
+def _values_backward(out):
+    for value, grad in zip(out._context, out.grad.flat):
+        if value.requires_grad:
+            value.grad += grad
+
+
+_BACKWARD = {
+    '+': _add_backward,
+    '*': _mul_backward,
+    '**': _pow_backward,
+    '@': _matmul_backward,
+    'exp': _exp_backward,
+    'log': _log_backward,
+    'tanh': partial(_activation_backward, _ACTIVATIONS['tanh'][1]),
+    'ReLU': partial(_activation_backward, _ACTIVATIONS['relu'][1]),
+    'sigmoid': partial(_activation_backward, _ACTIVATIONS['sigmoid'][1]),
+    'clip': _clip_backward,
+    'sum': _sum_backward,
+    'getitem': _getitem_backward,
+    'reshape': _reshape_backward,
+    'transpose': _transpose_backward,
+    'values': _values_backward,
+}
@@ -1,3 +1,9 @@
+from dlafs.array import ValueArray
+from dlafs.tensor import Tensor
+from dlafs.jit import compile
+from dlafs.nn.common import Module
+
+
 class Trainer:
 
     def __init__(self, model, loss, learning_rate):
@@ -5,19 +11,90 @@ class Trainer:
         self.loss = loss
         self.learning_rate = learning_rate
 
-    def train(self, inputs, labels, num_iterations, silent=False):
+    def train(self, inputs, labels, num_iterations, silent=False, compiled=False):
+        """Train the model with gradient descent on the loss over all inputs.
+
+        With `compiled`, the graph of the loss is traced once with dlafs.jit.compile and
+        replayed every iteration, instead of being rebuilt, see compile for the caveats.
+        """
+        if compiled:
+            step = compile(_Batch(self.model), inputs, self.loss, labels).step
         data = []
         for i in range(num_iterations):
-            outputs = (self.model(xi) for xi in inputs)
-            loss = self.loss(labels, outputs)
-            loss.backward()
+            if compiled:
+                loss = step(inputs, labels)
+            else:
+                if isinstance(inputs, Tensor):  # The whole batch at once
+                    outputs = self.model(inputs)
+                else:
+                    outputs = (self.model(xi) for xi in inputs)
+                loss = self.loss(labels, outputs)
+                loss.backward()
+                loss = float(loss.data)
             update_weights(self.model, learning_rate=self.learning_rate)
             if not silent:
-                print(f'{i}: {loss.data:.4f}')
-            data.append(loss.data)
+                print(f'{i}: {loss:.4f}')
+            data.append(loss)
+        return data
+
+    def train_truncated_bptt(self, inputs, labels, window, stride=None, num_iterations=1,
+                             silent=False):
+        """Train a RecurrentNN on one long sequence with truncated backpropagation through time.
+
+        inputs has a timestep and labels a label for each timestep. Every `stride` timesteps
+        (by default `window`), the model is run over the next `window` timesteps, and the
+        weights are updated with the gradient of the loss over them. The hidden state passed
+        on to the next window is detached, so updates cost the same however long the
+        sequence is. Returns the mean loss over the windows of each iteration.
+        """
+        stride = window if stride is None else stride
+        if not 0 < stride <= window:
+            raise ValueError(f'stride must be between 1 and the window, got {stride}')
+        inputs = ValueArray(inputs, requires_grad=False).values
+        # The labels are reused by every window, so they're cut off from any graph
+        labels = ValueArray(_detach(ValueArray(labels).values), requires_grad=False).values
+
+        data = []
+        for i in range(num_iterations):
+            state, losses = None, []
+            for start in range(0, len(inputs), stride):
+                # The next window starts from the state after `stride` timesteps
+                outputs, next_state = self.model.forward(inputs[start:start + stride], state)
+                rest = inputs[start + stride:start + window]
+                if rest:
+                    outputs = outputs.values + self.model(rest, next_state).values
+                loss = self.loss(labels[start:start + window], outputs)
+                loss.backward()
+                update_weights(self.model, learning_rate=self.learning_rate)
+                state = _detach(next_state)
+                losses.append(loss.data)
+            loss = sum(losses) / len(losses)
+            if not silent:
+                print(f'{i}: {loss:.4f}')
+            data.append(loss)
         return data
 
 
+class _Batch(Module):
+    """Applies a model to every input in a batch"""
+
+    def __init__(self, model):
+        self.model = model
+
+    def __call__(self, inputs):
+        return [self.model(x) for x in inputs]
+
+    def parameters(self):
+        return self.model.parameters()
+
+
+def _detach(state):
+    """Return the data of the Values in a nested state, cutting it off from the graph"""
+    if isinstance(state, (list, tuple)):
+        return type(state)(_detach(s) for s in state)
+    return state.data
+
+
 def update_weights(model, learning_rate=1e-2):
     for parameter in model.parameters():
         parameter.data -= parameter.grad * learning_rate
@@ -0,0 +1,115 @@
+import pytest
+import random
+import numpy as np
+import torch
+
+from dlafs import ValueArray
+from dlafs.nn import *
+from dlafs.loss import mse
+from dlafs.train import Trainer
+
+
+@pytest.mark.parametrize('stride, padding', [(1, 0), (2, 1)])
+def test_conv1d_vs_torch(stride, padding):
+    # Arrange
+    random.seed(42)
+    x = np.array(ValueArray.random_uniform(shape=(7, 2), low=-1, high=1).to_list())
+    layer = Conv1D(2, 3, kernel_size=3, stride=stride, padding=padding)
+    torch_layer = torch.nn.Conv1d(2, 3, kernel_size=3, stride=stride, padding=padding).double()
+    _copy_torch_weights(layer, torch_layer)
+    # Act
+    y = layer(x.tolist())
+    _sum(y).backward()
+    torch_y = torch_layer(torch.tensor(x.T).unsqueeze(0))[0].T
+    torch_y.sum().backward()
+    # Assert
+    assert y.to_numpy() == pytest.approx(torch_y.detach().numpy())
+    assert _w_grad(layer) == pytest.approx(_torch_w_grad(torch_layer))
+
+
+@pytest.mark.parametrize('kernel_size, stride, padding', [(3, 1, 0), ((2, 3), (2, 1), (1, 0))])
+def test_conv2d_vs_torch(kernel_size, stride, padding):
+    # Arrange
+    random.seed(42)
+    x = np.array(ValueArray.random_uniform(shape=(5, 6, 2), low=-1, high=1).to_list())
+    layer = Conv2D(2, 3, kernel_size=kernel_size, stride=stride, padding=padding)
+    torch_layer = torch.nn.Conv2d(2, 3, kernel_size, stride=stride, padding=padding).double()
+    _copy_torch_weights(layer, torch_layer)
+    # Act
+    y = layer(x.tolist())
+    _sum(y).backward()
+    torch_y = torch_layer(torch.tensor(x).permute(2, 0, 1).unsqueeze(0))[0].permute(1, 2, 0)
+    torch_y.sum().backward()
+    # Assert
+    assert y.to_numpy() == pytest.approx(torch_y.detach().numpy())
+    assert _w_grad(layer) == pytest.approx(_torch_w_grad(torch_layer))
+
+
+@pytest.mark.parametrize('pool_type, torch_pool', [
+    (MaxPool2D, torch.nn.MaxPool2d), (AvgPool2D, torch.nn.AvgPool2d)
+])
+def test_pool2d_vs_torch(pool_type, torch_pool):
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(4, 5, 2), low=-1, high=1)
+    torch_x = torch.tensor(x.to_numpy()).permute(2, 0, 1).unsqueeze(0).requires_grad_()
+    # Act
+    y = pool_type(2)(x)
+    _sum(y).backward()
+    torch_y = torch_pool(2)(torch_x)[0].permute(1, 2, 0)
+    torch_y.sum().backward()
+    # Assert
+    assert y.to_numpy() == pytest.approx(torch_y.detach().numpy())
+    x_grad = np.array([[[v.grad for v in pixel] for pixel in row] for row in x.values])
+    assert x_grad == pytest.approx(torch_x.grad[0].permute(1, 2, 0).numpy())
+
+
+@pytest.mark.parametrize('pool_type', [MaxPool1D, AvgPool1D])
+def test_pool1d(pool_type):
+    # Arrange
+    x = [[1, -1], [3, 2], [0, 5], [2, 2], [7, 7]]
+    EXPECTED = [[3, 2], [2, 5]] if pool_type is MaxPool1D else [[2, 0.5], [1, 3.5]]
+    # Act
+    y = pool_type(2)(x)
+    # Assert
+    assert y.to_numpy() == pytest.approx(np.array(EXPECTED))
+
+
+def test_train_cnn():
+    # Arrange
+    random.seed(42)
+    x = [ValueArray.random_uniform(shape=(6, 6, 1), low=0, high=1).to_list() for _ in range(8)]
+    y = [np.array(x_i)[:3].mean() - np.array(x_i)[3:].mean() for x_i in x]
+    model = VanillaNN([
+        Conv2D(1, 2, kernel_size=3, activation='tanh'),
+        MaxPool2D(2),
+        Flatten(),
+        Layer(8, 1, activation='linear'),
+    ])
+    trainer = Trainer(model, mse, learning_rate=1e-1)
+    # Act
+    loss = trainer.train(x, y, 20, silent=True)
+    # Assert
+    assert loss[-1] < loss[0] / 2
+
+
+def _copy_torch_weights(layer, torch_layer):
+    # PyTorch orders kernels (out, in, *kernel), the rows here are (*kernel, in)
+    kernels = torch_layer.weight.detach().movedim(1, -1).reshape(layer.out_channels, -1)
+    for row, torch_row in zip(layer.w.values, kernels.tolist()):
+        for w, data in zip(row, torch_row):
+            w.data = data
+    for b, data in zip(layer.b.values, torch_layer.bias.tolist()):
+        b.data = data
+
+
+def _w_grad(layer):
+    return np.array([[w.grad for w in row] for row in layer.w.values])
+
+
+def _torch_w_grad(torch_layer):
+    return torch_layer.weight.grad.movedim(1, -1).reshape(len(torch_layer.weight), -1).numpy()
+
+
+def _sum(y):
+    return sum(y.flatten())
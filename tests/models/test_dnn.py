@@ -1,7 +1,7 @@
 import pytest
 import random
 
-from dlafs import ValueArray
+from dlafs import ValueArray, no_grad
 from dlafs.nn.dnn import *
 from dlafs.loss import binary_cross_entropy
 from dlafs.train import Trainer
@@ -85,6 +85,23 @@ def test_vanilla_nn():
     assert y_hat[0].data == pytest.approx(EXPECTED, abs=1e-6)
 
 
+def test_vanilla_nn_no_grad():
+    # Arrange
+    random.seed(42)
+    model = VanillaNN([
+        Layer(3, 4, activation='relu'),
+        Layer(4, 2, activation='sigmoid')
+    ])
+    x = ValueArray([1, 2, 3], label='x')
+    expected = model(x).to_list()
+    # Act
+    with no_grad():
+        y_hat = model(x)
+    # Assert
+    assert y_hat.to_list() == expected
+    assert all(y_i._children == () for y_i in y_hat)
+
+
 def test_vanilla_nn_backward():
     # Arrange
     EXPECTED_GRADS = [-0.0972, -0.0647, 0.0324]
@@ -125,6 +142,29 @@ def test_vanilla_nn_zero_grad():
         assert parameter.grad == 0
 
 
+@pytest.mark.parametrize('num_outputs', [1, 3])
+def test_layer_weight_matrix(num_outputs):
+    """A layer with a weight matrix should match the Neurons initialized with the same seed."""
+    # Arrange
+    random.seed(42)
+    expected_layer = Layer(4, num_outputs, activation='tanh')
+    random.seed(42)
+    layer = Layer(4, num_outputs, activation='tanh', weight_matrix=True)
+    x = [[1, -2, 0.5, 3], [0.2, 0.4, -1, 0]]
+    expected = ValueArray([expected_layer(x_i) for x_i in x])
+    expected.sum().backward()
+    # Act
+    actual = layer(x)
+    actual.sum().backward()
+    # Assert
+    assert [p.data for p in layer.parameters()] == [p.data for p in expected_layer.parameters()]
+    assert actual.to_numpy() == pytest.approx(expected.to_numpy())
+    assert [p.grad for p in layer.parameters()] == \
+        pytest.approx([p.grad for p in expected_layer.parameters()])
+    assert ValueArray(layer(x[0])).to_numpy() == \
+        pytest.approx(ValueArray(expected_layer(x[0])).to_numpy())
+
+
 @pytest.mark.integration
 def test_train_vanilla_nn():
     # Arrange
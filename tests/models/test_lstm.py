@@ -0,0 +1,86 @@
+import pytest
+import random
+import numpy as np
+import torch
+
+from dlafs import ValueArray
+from dlafs.nn import *
+from dlafs.train import Trainer
+from dlafs.loss import mse
+
+
+@pytest.mark.parametrize('layer_type', ['lstm', 'gru'])
+def test_gated_layer_vs_torch(layer_type):
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(5, 3), low=-1, high=1).values
+    if layer_type == 'lstm':
+        layer, torch_layer = LSTMLayer(3, 4), torch.nn.LSTM(3, 4).double()
+    else:
+        layer, torch_layer = GRULayer(3, 4), torch.nn.GRU(3, 4).double()
+    _copy_torch_weights(layer, torch_layer)
+    torch_x = torch.tensor(ValueArray(x).to_numpy()).unsqueeze(1)
+    # Act
+    a = layer(x)
+    sum(a_tj for a_t in a.values for a_tj in a_t).backward()
+    torch_a, _ = torch_layer(torch_x)
+    torch_a.sum().backward()
+    # Assert
+    assert a.to_numpy() == pytest.approx(torch_a.squeeze(1).detach().numpy(), abs=1e-6)
+    w_grad = [[w.grad for w in row] for row in layer.w.values]
+    assert np.array(w_grad) == pytest.approx(_torch_weight_grad(torch_layer), abs=1e-6)
+
+
+@pytest.mark.parametrize('layer_type', [LSTMLayer, GRULayer])
+def test_gated_layer_state(layer_type):
+    """Continuing from the returned state should give the same outputs as one call."""
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(6, 2), low=-1, high=1).values
+    model = RecurrentNN([layer_type(2, 3), Layer(3, 1, activation='linear')])
+    expected = model(x).to_numpy()
+    # Act
+    first, state = model.forward(x[:4])
+    second, _ = model.forward(x[4:], state)
+    steps = []
+    state = None
+    for x_t in x:
+        y_t, state = model.step(x_t, state)
+        steps.append(y_t.data)
+    # Assert
+    actual = first.to_numpy().tolist() + second.to_numpy().tolist()
+    assert actual == pytest.approx(expected.tolist())
+    assert steps == pytest.approx(expected.tolist())
+
+
+@pytest.mark.parametrize('layer_type', [LSTMLayer, GRULayer])
+def test_train_gated_layer(layer_type):
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(30, 2), low=-1, high=1).values
+    y = [x_t[0] - x_t[1] for x_t in x]
+    model = RecurrentNN([layer_type(2, 4), Layer(4, 1, activation='linear')])
+    trainer = Trainer(model, mse, learning_rate=2e-1)
+    # Act
+    loss = trainer.train_truncated_bptt(x, y, window=5, num_iterations=10, silent=True)
+    # Assert
+    assert loss[-1] < loss[0] / 2
+
+
+def _copy_torch_weights(layer, torch_layer):
+    hidden_size = layer.hidden_size
+    w_ih, w_hh = torch_layer.weight_ih_l0.tolist(), torch_layer.weight_hh_l0.tolist()
+    b_ih, b_hh = torch_layer.bias_ih_l0.tolist(), torch_layer.bias_hh_l0.tolist()
+    for k, row in enumerate(layer.w.values):
+        for w, data in zip(row, w_ih[k] + w_hh[k]):
+            w.data = data
+    for k, b in enumerate(layer.b.values):
+        is_new_gate = isinstance(layer, GRULayer) and k >= 2 * hidden_size
+        b.data = b_ih[k] if is_new_gate else b_ih[k] + b_hh[k]
+    if isinstance(layer, GRULayer):
+        for b, data in zip(layer.b_hn.values, b_hh[2 * hidden_size:]):
+            b.data = data
+
+
+def _torch_weight_grad(torch_layer):
+    return torch.cat([torch_layer.weight_ih_l0.grad, torch_layer.weight_hh_l0.grad], dim=1).numpy()
@@ -1,9 +1,11 @@
 import pytest
 import random
+import numpy as np
 
-from dlafs import ValueArray
+from dlafs import ValueArray, jvp
 from dlafs.nn import *
 from dlafs.loss import mse
+from dlafs.train import Trainer
 
 
 def test_recurrent_nn():
@@ -21,6 +23,160 @@ def test_recurrent_nn():
     assert model([(1, 3), (4, 2), [5, 7], [-2, 15]])[-1].shape == (2,)
 
 
+@pytest.mark.parametrize('checkpoint_every', [1, 3, 10])
+def test_recurrent_layer_checkpoint(checkpoint_every):
+    """Checkpointing should give the same outputs and gradients as keeping the graph."""
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(7, 2), low=-1, high=1).values
+    layers = []
+    for k in (None, checkpoint_every):
+        random.seed(0)
+        layers.append(RecurrentLayer(num_inputs=2, hidden_size=3, checkpoint_every=k))
+    expected_layer, layer = layers
+    expected = expected_layer(x)
+    _squared_sum(expected).backward()
+    # Act
+    actual = layer(x)
+    _squared_sum(actual).backward()
+    # Assert
+    assert actual.to_numpy() == pytest.approx(expected.to_numpy())
+    assert ([p.grad for p in layer.parameters()]
+            == pytest.approx([p.grad for p in expected_layer.parameters()]))
+
+
+def test_recurrent_nn_checkpoint_stacked():
+    """A checkpointed layer should backpropagate to the layer before it."""
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(7, 2), low=-1, high=1).values
+    models = []
+    for k in (None, 3):
+        random.seed(0)
+        models.append(RecurrentNN([
+            RecurrentLayer(num_inputs=2, hidden_size=4),
+            RecurrentLayer(num_inputs=4, hidden_size=3, checkpoint_every=k),
+            Layer(3, 1, activation='linear'),
+        ]))
+    expected_model, model = models
+    sum((y - 0.5) ** 2 for y in expected_model(x)).backward()
+    # Act
+    sum((y - 0.5) ** 2 for y in model(x)).backward()
+    # Assert
+    assert ([p.grad for p in model.parameters()]
+            == pytest.approx([p.grad for p in expected_model.parameters()]))
+
+
+def test_recurrent_layer_checkpoint_jvp():
+    """Forward-mode derivatives should go through a checkpointed layer."""
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(5, 2), low=-1, high=1).to_list()
+    direction = ValueArray.random_uniform(shape=(5, 2), low=-1, high=1).to_list()
+    layers = []
+    for k in (None, 2):
+        random.seed(0)
+        layers.append(RecurrentLayer(num_inputs=2, hidden_size=3, checkpoint_every=k))
+    expected_layer, layer = layers
+    _, expected = jvp(expected_layer, [x], [direction])
+    # Act
+    _, actual = jvp(layer, [x], [direction])
+    # Assert
+    assert np.ravel(actual) == pytest.approx(np.ravel(expected))
+    assert any(np.ravel(actual))
+
+
+def test_recurrent_nn_forward_with_state():
+    """Continuing from the returned state should give the same outputs as one call."""
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(6, 2), low=-1, high=1).values
+    model = _small_recurrent_nn()
+    expected = model(x).to_numpy()
+    # Act
+    first, state = model.forward(x[:4])
+    second, _ = model.forward(x[4:], state)
+    # Assert
+    assert len(state) == 2 and len(state[0]) == 4
+    actual = first.to_numpy().tolist() + second.to_numpy().tolist()
+    assert actual == pytest.approx(expected.tolist())
+
+
+def test_recurrent_nn_step():
+    """Stepping through a sequence should give the outputs of running all of it at once."""
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(5, 2), low=-1, high=1).values
+    model = _small_recurrent_nn()
+    expected = model(x).to_numpy()
+    layer = model.layers[0]
+    expected_hidden = layer(x).to_numpy()
+    # Act
+    state, a_t, outputs, hidden = None, None, [], []
+    for x_t in x:
+        y_t, state = model.step(x_t, state)
+        a_t = layer.step(x_t, a_t)
+        outputs.append(y_t.data)
+        hidden.append([a.data for a in a_t])
+    # Assert
+    assert outputs == pytest.approx(expected.tolist())
+    assert ValueArray(hidden).to_numpy() == pytest.approx(expected_hidden)
+    assert not y_t.requires_grad and not y_t._children
+
+
+@pytest.mark.parametrize('batch_size', [None, 1, 3])
+def test_recurrent_nn_batch(batch_size):
+    """A batch should give the outputs and gradients of running the sequences one by one."""
+    # Arrange
+    random.seed(42)
+    x = _generate_random_length_data(7, max_length=5, num_features=2)
+    model = _small_recurrent_nn()
+    expected = [model(x_i) for x_i in x]
+    sum(y_i[-1] for y_i in expected).backward()
+    expected_grads = [p.grad for p in model.parameters()]
+    model.zero_grad()
+    # Act
+    actual = model.batch(x, batch_size)
+    sum(y_i[-1] for y_i in actual).backward()
+    # Assert
+    for actual_i, expected_i in zip(actual, expected):
+        assert actual_i.to_numpy() == pytest.approx(expected_i.to_numpy())
+    assert [p.grad for p in model.parameters()] == pytest.approx(expected_grads)
+
+
+def test_truncated_bptt_full_window():
+    """With one window over the whole sequence, it should be plain backpropagation."""
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(6, 2), low=-1, high=1).values
+    y = [sum(x_t) for x_t in x]
+    random.seed(0)
+    expected_model = _small_recurrent_nn()
+    random.seed(0)
+    model = _small_recurrent_nn()
+    mse(y, expected_model(x)).backward()
+    expected = [p.data - 1e-1 * p.grad for p in expected_model.parameters()]
+    # Act
+    Trainer(model, mse, learning_rate=1e-1).train_truncated_bptt(x, y, window=6, silent=True)
+    # Assert
+    assert [p.data for p in model.parameters()] == pytest.approx(expected)
+
+
+@pytest.mark.parametrize('window, stride', [(4, 4), (5, 2)])
+def test_truncated_bptt(window, stride):
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(40, 2), low=-1, high=1).values
+    y = [x_t[0] - x_t[1] for x_t in x]
+    model = _small_recurrent_nn()
+    trainer = Trainer(model, mse, learning_rate=1e-1)
+    # Act
+    loss = trainer.train_truncated_bptt(x, y, window, stride, num_iterations=10, silent=True)
+    # Assert
+    assert len(loss) == 10
+    assert loss[-1] < loss[0] / 2
+
+
 @pytest.mark.integration
 def test_train_recurrent_nn():
     # Arrange
@@ -41,6 +197,18 @@ def test_train_recurrent_nn():
     assert loss[-1] == pytest.approx(0.0594, abs=1e-3)
 
 
+def _small_recurrent_nn():
+    return RecurrentNN([
+        RecurrentLayer(num_inputs=2, hidden_size=4, activation='tanh'),
+        RecurrentLayer(num_inputs=4, hidden_size=3, activation='tanh'),
+        Layer(3, 1, activation='linear')
+    ])
+
+
+def _squared_sum(a):
+    return sum((a_ti - 0.5) ** 2 for a_t in a.values for a_ti in a_t)
+
+
 def _generate_random_length_data(num_examples, max_length, num_features):
     x = []
     for _ in range(num_examples):
@@ -50,7 +218,7 @@ def _generate_random_length_data(num_examples, max_length, num_features):
 
 
 def _sum_data(x):
-    return ValueArray([[sum([sum(x_ij) for x_ij in x_i])] for x_i in x], label='y')
+    return ValueArray([[sum(v.data for x_ij in x_i for v in x_ij)] for x_i in x], label='y')
 
 
 def _train_rnn(model, loss_fn, inputs, labels, epochs=50, lr=3e-1):
@@ -0,0 +1,89 @@
+import pytest
+import random
+import torch
+
+from dlafs import ValueArray, no_grad
+from dlafs.nn import *
+
+
+def test_multi_head_attention_vs_torch():
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(5, 4), low=-1, high=1).to_list()
+    attention = MultiHeadAttention(4, num_heads=2)
+    torch_attention = torch.nn.MultiheadAttention(4, 2, batch_first=True).double()
+    _copy_torch_weights(attention, torch_attention)
+    torch_x = torch.tensor([x], dtype=torch.float64)
+    mask = torch.triu(torch.ones(5, 5, dtype=torch.bool), diagonal=1)
+    # Act
+    y = attention(x)
+    sum(y.flatten()).backward()
+    torch_y, _ = torch_attention(torch_x, torch_x, torch_x, attn_mask=mask)
+    torch_y.sum().backward()
+    # Assert
+    assert y.to_numpy() == pytest.approx(torch_y[0].detach().numpy())
+    w_grad = [w.grad for n in attention.query.neurons for w in n.w.values]
+    torch_w_grad = torch_attention.in_proj_weight.grad[:4].flatten().tolist()
+    assert w_grad == pytest.approx(torch_w_grad)
+
+
+def test_layer_norm_vs_torch():
+    # Arrange
+    x = [0.5, -1.0, 2.0, 0.3]
+    norm = LayerNorm(4)
+    for gamma, beta, data in zip(norm.gamma, norm.beta, [(1.5, 0.1), (0.5, -0.2), (1, 0), (2, 1)]):
+        gamma.data, beta.data = data
+    torch_norm = torch.nn.LayerNorm(4).double()
+    with torch.no_grad():
+        torch_norm.weight.copy_(torch.tensor([1.5, 0.5, 1, 2]))
+        torch_norm.bias.copy_(torch.tensor([0.1, -0.2, 0, 1]))
+    # Act
+    y = norm(x)
+    (y[0] - 2 * y[2]).backward()
+    torch_y = torch_norm(torch.tensor(x, dtype=torch.float64))
+    (torch_y[0] - 2 * torch_y[2]).backward()
+    # Assert
+    assert y.to_numpy() == pytest.approx(torch_y.detach().numpy())
+    assert [g.grad for g in norm.gamma] == pytest.approx(torch_norm.weight.grad.tolist())
+
+
+def test_decoder_block_kv_cache():
+    """Feeding one token at a time with a cache should match running the whole sequence."""
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform(shape=(5, 4), low=-1, high=1).to_list()
+    block = DecoderBlock(4, num_heads=2, hidden_size=8)
+    expected = block(x)
+    sum(expected.flatten()).backward()
+    expected_grads = [p.grad for p in block.parameters()]
+    block.zero_grad()
+    # Act
+    cache = KVCache()
+    actual = [block([x_t], cache).values[0] for x_t in x]
+    sum(ValueArray(actual).flatten()).backward()
+    with no_grad():
+        generation_cache = KVCache()
+        generated = [block([x_t], generation_cache).values[0] for x_t in x]
+    # Assert
+    assert len(cache) == 5
+    assert ValueArray(actual).to_numpy() == pytest.approx(expected.to_numpy())
+    assert ValueArray(generated).to_numpy() == pytest.approx(expected.to_numpy())
+    assert [p.grad for p in block.parameters()] == pytest.approx(expected_grads)
+
+
+def _copy_torch_weights(attention, torch_attention):
+    embed_dim = attention.embed_dim
+    in_weight = torch_attention.in_proj_weight.tolist()
+    in_bias = torch_attention.in_proj_bias.tolist()
+    for i, layer in enumerate((attention.query, attention.key, attention.value)):
+        _copy_layer(layer, in_weight[i * embed_dim:(i + 1) * embed_dim],
+                    in_bias[i * embed_dim:(i + 1) * embed_dim])
+    _copy_layer(attention.output, torch_attention.out_proj.weight.tolist(),
+                torch_attention.out_proj.bias.tolist())
+
+
+def _copy_layer(layer, weight, bias):
+    for neuron, row, b in zip(layer.neurons, weight, bias):
+        for w, data in zip(neuron.w.values, row):
+            w.data = data
+        neuron.b.data = b
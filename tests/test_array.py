@@ -2,6 +2,7 @@ import pytest
 from .fixtures import *
 
 import numpy as np
+import torch
 import random
 from dlafs import ValueArray
 from dlafs import Value as V
@@ -244,3 +245,179 @@ def test_contains():
     assert five_in_varray
     assert value_in_array
     assert not ten_in_varray
+
+
+def test_requires_grad():
+    # Arrange
+    varray = ValueArray([[1, 2], [3, 4]], requires_grad=False)
+    # Act
+    no_grad = varray.requires_grad
+    varray[0, 1] = V(5)
+    some_grad = varray.requires_grad
+    varray.requires_grad = False
+    # Assert
+    assert not no_grad
+    assert some_grad
+    assert not varray.requires_grad
+    assert ValueArray.random_normal((2, 2)).requires_grad
+    assert not ValueArray.zeros((2, 2), requires_grad=False).requires_grad
+
+
+@pytest.mark.parametrize(
+    'shape, new_shape',
+    [((4, ), (2, 2)), ((2, 3), (3, 2)), ((2, 3, 4), (6, -1)), ((2, 3, 4), (-1, ))],
+)
+def test_reshape(shape, new_shape):
+    # Arrange
+    np_array = np.arange(np.prod(shape)).reshape(shape)
+    varray = ValueArray.from_numpy(np_array)
+    expected = np_array.reshape(new_shape)
+    # Act
+    actual = varray.reshape(new_shape)
+    # Assert
+    assert np.array_equal(actual.to_numpy(), expected)
+    assert actual._storage is varray._storage
+
+
+@pytest.mark.parametrize('axes', [(), (1, 0, 2), (2, 0, 1)])
+def test_transpose(axes):
+    # Arrange
+    np_array = _create_array(num_dims=3)
+    varray = ValueArray.from_numpy(np_array)
+    expected = np_array.transpose(*axes)
+    # Act
+    actual = varray.transpose(*axes)
+    # Assert
+    assert np.array_equal(actual.to_numpy(), expected)
+    assert np.array_equal(actual[1:3, 0, [0, 2]].to_numpy(), expected[1:3, 0, [0, 2]])
+    assert np.array_equal(actual.flatten().to_numpy(), expected.flatten())
+    assert actual._storage is varray._storage
+
+
+def test_view_shares_values():
+    # Arrange
+    varray = ValueArray([[1, 2, 3], [4, 5, 6]])
+    # Act
+    varray.T[2, 0] = 7
+    varray.reshape(3, 2)[0] = [8, 9]
+    # Assert
+    assert varray.to_list() == [[8, 9, 7], [4, 5, 6]]
+    assert varray.T.values[0][1] is varray.values[1][0]
+
+
+@pytest.mark.parametrize(
+    'data', [[[1, 2], [3]], [[1, 2], 3], [[1, 2], [3, [4, 5]]]],
+    ids=['short-row', 'scalar-row', 'nested-item'],
+)
+def test_inconsistent_shape(data):
+    # Act & Assert
+    with pytest.raises(ValueError):
+        ValueArray(data)
+
+
+def test_slice_is_view():
+    # Arrange
+    varray = ValueArray.from_numpy(_create_array(num_dims=2))
+    # Act
+    column = varray[1:, 2]
+    column[0] = -1
+    rows = list(varray)
+    rows[3][::2] = [-2, -3]
+    copy = varray[[0, 1]]
+    copy[0, 0] = -4
+    # Assert
+    assert column._storage is varray._storage
+    assert all(row._storage is varray._storage for row in rows)
+    assert varray.to_list()[1][2] == -1
+    assert varray.to_list()[3] == [-2, 13, -3, 15]
+    assert varray[0, 0].data == 0
+    assert [v.data for v in varray[1:3].T[2]] == [-1, 10]
+
+
+@pytest.mark.parametrize('operations', [
+    lambda a, b: a + b,
+    lambda a, b: a - b[0] * 2,
+    lambda a, b: 1 - a / (b ** 2 + 1),
+    lambda a, b: a[:, :1] * b[1] + 3 / (a * a + 1),
+    lambda a, b: (-a).exp() + (b * b + 0.5).log() - a.tanh() * b.relu() + a.sigmoid(),
+    lambda a, b: a.sum(axis=0) * b.mean(axis=1)[0] - a.mean(),
+    lambda a, b: a * (a.sum() * b.max()),
+    lambda a, b: a.logsumexp(axis=0) - b.logsumexp(axis=-1)[1] + a.flatten().logsumexp(axis=0),
+    lambda a, b: a.softmax(axis=-1) * b + a.softmax(axis=0) * 2,
+])
+def test_math_vs_torch(operations):
+    # Arrange
+    A = [[0.5, -1.2, 2.0], [1.5, 0.3, -0.25]]
+    B = [[0.7, 0.2, -1.0], [0.1, -0.4, 0.9]]
+    torch_a, torch_b = (torch.tensor(x, requires_grad=True, dtype=torch.float64) for x in (A, B))
+    expected = operations(torch_a, torch_b)
+    expected.sum().backward()
+    a, b = ValueArray(A), ValueArray(B)
+    # Act
+    actual = operations(a, b)
+    actual.sum().backward()
+    # Assert
+    assert actual.to_numpy() == pytest.approx(expected.detach().numpy())
+    assert [v.grad for v in a._elements()] == pytest.approx(torch_a.grad.flatten().tolist())
+    assert [v.grad for v in b._elements()] == pytest.approx(torch_b.grad.flatten().tolist())
+
+
+def test_broadcast_with_values():
+    # Arrange
+    varray = ValueArray([[1, 2], [3, 4]])
+    x = V(2.0)
+    # Act
+    actual = x * varray - varray / x + [10, 20]
+    powers = 2 ** varray[0] + x ** varray[1]
+    # Assert
+    assert actual.to_list() == [[11.5, 23], [14.5, 26]]
+    assert powers.to_list() == [2 + 8, 4 + 16]
+    with pytest.raises(ValueError):
+        varray + [1, 2, 3]
+
+
+def test_max():
+    # Arrange
+    varray = ValueArray([[1, 5, 2], [7, 3, 4]])
+    # Act
+    actual = varray.max(axis=0)
+    actual.sum().backward()
+    # Assert
+    assert actual.to_list() == [7, 5, 4]
+    assert varray.max(axis=-1).to_list() == [5, 7]
+    assert varray.max() is varray[1, 0]
+    assert [v.grad for v in varray._elements()] == [0, 1, 0, 1, 0, 1]
+
+
+@pytest.mark.parametrize(
+    'shape_a, shape_b',
+    [((3, ), (3, )), ((3, ), (3, 2)), ((2, 3), (3, )), ((2, 3), (3, 4)), ((2, 2, 3), (3, 4)),
+     ((2, 1, 2, 3), (3, 3, 2))],
+    ids=['vector-vector', 'vector-matrix', 'matrix-vector', 'matrix-matrix', 'batched',
+         'broadcast-batch'],
+)
+def test_matmul_vs_torch(shape_a, shape_b):
+    # Arrange
+    random.seed(0)
+    data_a = ValueArray.random_normal(shape_a).to_list()
+    data_b = ValueArray.random_normal(shape_b).to_list()
+    torch_a, torch_b = (torch.tensor(x, requires_grad=True, dtype=torch.float64)
+                        for x in (data_a, data_b))
+    expected = torch_a @ torch_b
+    (expected * expected).sum().backward()
+    a, b = ValueArray(data_a), ValueArray(data_b)
+    # Act
+    actual = a @ b
+    squared = actual * actual
+    (squared.sum() if isinstance(squared, ValueArray) else squared).backward()
+    # Assert
+    actual = actual.to_numpy() if isinstance(actual, ValueArray) else actual.data
+    assert actual == pytest.approx(expected.detach().numpy())
+    assert [v.grad for v in a._elements()] == pytest.approx(torch_a.grad.flatten().tolist())
+    assert [v.grad for v in b._elements()] == pytest.approx(torch_b.grad.flatten().tolist())
+
+
+def test_matmul_shape_mismatch():
+    # Act & Assert
+    with pytest.raises(ValueError):
+        ValueArray.zeros((2, 3)) @ ValueArray.zeros((2, 3))
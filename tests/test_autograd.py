@@ -2,8 +2,9 @@ import pytest
 from .fixtures import *
 
 import math
+import pickle
 import torch
-from dlafs.autograd import Value
+from dlafs.autograd import Value, Tape, no_grad, checkpoint
 
 ADD_OTHER = ((5, 2), (lambda x, y: x + y), 7, (1, 1))
 ADD_SELF = ((10.5,), (lambda x: x + x), 21.0, (2,))
@@ -98,3 +99,242 @@ def test_equals():
     assert actual != wrong_value
     assert actual != wrong_grad
     assert actual != wrong_obj_type
+
+
+def test_backward_deep_graph():
+    """Graphs deeper than the recursion limit should still backpropagate."""
+    # Arrange
+    x = Value(0.5)
+    y = x
+    # Act
+    for _ in range(5000):
+        y = y + x
+    y.backward()
+    # Assert
+    assert math.isclose(y.data, 2500.5)
+    assert x.grad == 5001
+
+
+def test_backward_reuse_topological_order():
+    # Arrange
+    x, y = Value(2), Value(3)
+    z = (x * y).tanh() + x
+    topo = z.topological_sort()
+    z.backward(retain_graph=True)
+    expected_grads = [x.grad, y.grad]
+    x.grad, y.grad = 0, 0
+    # Act
+    z.backward(topo=topo, retain_graph=True)
+    # Assert
+    assert topo[-1] is z
+    assert len(topo) == 5
+    assert [x.grad, y.grad] == expected_grads
+
+
+def test_value_is_compact():
+    # Arrange
+    x, y = Value(2), Value(3)
+    # Act
+    z = x * y
+    # Assert
+    assert not hasattr(z, '__dict__')
+    assert z._children == (x, y)
+    assert z._operator == '*'
+
+
+@pytest.mark.parametrize(
+    ("values", "operations"),
+    [
+        ((3,), lambda x: (x + x) + x**2 / x.exp()),
+        ((2, 3, 4, 5), lambda x, y, z, w: x.log()**y + z.tanh() / w),
+    ]
+)
+def test_tape_backward(values, operations):
+    """Replaying the tape should give the same gradients as searching the graph."""
+    # Arrange
+    expected_values = [Value(v) for v in values]
+    operations(*expected_values).backward()
+    values = [Value(v) for v in values]
+    # Act
+    with Tape() as tape:
+        actual = operations(*values)
+        unused = values[0] * 10  # noqa: F841
+    tape.backward(actual)
+    # Assert
+    assert tape.nodes == []
+    assert_grads_equal_expected(values, [v.grad for v in expected_values])
+
+
+def test_tape_only_records_while_active():
+    # Arrange
+    x = Value(2)
+    # Act
+    with Tape() as outer:
+        y = x * 3
+        with Tape() as inner:
+            z = y + 1
+        w = z.exp()
+    v = w - 1
+    # Assert
+    assert [id(n) for n in outer.nodes] == [id(y), id(z), id(w)]
+    assert [id(n) for n in inner.nodes] == [id(z)]
+    assert id(v) not in map(id, outer.nodes)
+    outer.backward(w)
+    assert math.isclose(x.grad, 3 * math.exp(7))
+
+
+def test_tape_backward_freed_graph():
+    # Arrange
+    x = Value(2)
+    with Tape() as outer:
+        with Tape() as inner:
+            y = (x * 3).exp()
+        z = y + 1
+    inner.backward(y)
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        outer.backward(z)
+
+
+@pytest.mark.parametrize('activation', ['linear', 'tanh', 'relu', 'sigmoid'])
+def test_dot_vs_torch(activation):
+    """The fused dot should match the same expression built from torch operations."""
+    # Arrange
+    weights, inputs, bias = [0.5, -1.2, 2.0], [1.5, 0.3, 0.25], 0.1
+    torch_activation = {'linear': lambda z: z, 'tanh': torch.tanh,
+                        'relu': torch.relu, 'sigmoid': torch.sigmoid}[activation]
+    tensors = [torch.tensor([v], requires_grad=True, dtype=torch.float64)
+               for v in weights + inputs + [bias]]
+    values = [Value(v) for v in weights + inputs + [bias]]
+
+    expected = torch_activation(sum(w * x for w, x in zip(tensors[:3], tensors[3:6])) + tensors[6])
+    expected.backward()
+    # Act
+    actual = Value.dot(values[:3], values[3:6], values[6], activation=activation)
+    num_children = len(actual._children)
+    actual.backward()
+    # Assert
+    assert num_children == 7
+    assert math.isclose(actual.data, expected.item())
+    assert_grads_equal_expected(values, tensors)
+
+
+def test_attention_vs_torch():
+    """The fused attention should match softmax attention built from torch operations."""
+    # Arrange
+    query = [0.5, -1.0, 0.3]
+    keys = [[0.2, 0.4, -0.5], [1.0, -0.3, 0.8], [-0.7, 0.1, 0.6], [0.3, 0.3, 0.3]]
+    values = [[1.0, -2.0], [0.5, 0.4], [-0.3, 1.2], [2.0, 0.1]]
+    torch_q, torch_k, torch_v = (torch.tensor(t, requires_grad=True, dtype=torch.float64)
+                                 for t in (query, keys, values))
+    p = torch.softmax(torch_k @ torch_q / math.sqrt(3), dim=0)
+    expected = p @ torch_v
+    (expected * torch.tensor([1.0, -3.0], dtype=torch.float64)).sum().backward()
+    q = [Value(x) for x in query]
+    k = [[Value(x) for x in key] for key in keys]
+    v = [[Value(x) for x in value] for value in values]
+    # Act
+    actual = Value.attention(q, k, v)
+    (actual[0] - 3 * actual[1]).backward()
+    # Assert
+    assert [o.data for o in actual] == pytest.approx(expected.tolist())
+    assert [x.grad for x in q] == pytest.approx(torch_q.grad.tolist())
+    assert [x.grad for key in k for x in key] == pytest.approx(torch_k.grad.flatten().tolist())
+    assert [x.grad for value in v for x in value] == pytest.approx(torch_v.grad.flatten().tolist())
+
+
+def test_no_grad():
+    # Arrange
+    x, y = Value(2), Value(3)
+    # Act
+    with no_grad():
+        z = (x * y).tanh() + Value.dot([x], [y])
+        with Tape() as tape:
+            w = z.exp()
+    v = x * y
+    # Assert
+    assert math.isclose(z.data, math.tanh(6) + 6)
+    assert z._children == () and w._children == ()
+    assert tape.nodes == []
+    assert v._children == (x, y)
+
+
+def test_backward_frees_graph():
+    # Arrange
+    x, y = Value(2), Value(3)
+    xy = x * y
+    z = xy.tanh() + x
+    # Act
+    z.backward()
+    # Assert
+    assert math.isclose(x.grad, 1 + 3 * (1 - math.tanh(6)**2))
+    assert z._children == () and xy._children == ()
+    with pytest.raises(RuntimeError):
+        z.backward()
+
+
+def test_backward_shared_freed_graph():
+    # Arrange
+    w = Value(2.0)
+    h = (w * 3).tanh()
+    (h * 2).backward()
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        (h * 5).backward()
+
+
+def test_requires_grad():
+    # Arrange
+    w = Value(2)
+    x = Value(3, requires_grad=False)
+    # Act
+    constant = (x * 4).exp()
+    y = w * x - constant + 1
+    y.backward()
+    # Assert
+    assert not constant.requires_grad and constant._children == ()
+    assert y.requires_grad
+    assert w.grad == 3
+    assert x.grad == 0
+
+
+def test_pickle_graph():
+    # Arrange
+    x, y = Value(2), Value(3)
+    z = Value.dot([x], [y], activation='tanh') * x.exp()
+    # Act
+    x_copy, y_copy, z_copy = pickle.loads(pickle.dumps([x, y, z]))
+    dot_copy = z_copy._children[0]
+    z.backward()
+    z_copy.backward()
+    # Assert
+    assert z_copy.data == z.data
+    assert dot_copy._operator == 'dot+tanh'
+    assert_grads_equal_expected([x_copy, y_copy], [x.grad, y.grad])
+
+
+@pytest.mark.parametrize('use_tape', [False, True])
+def test_checkpoint(use_tape):
+    """Recomputing the checkpointed part during backward should give the same gradients."""
+    # Arrange
+    def function(inputs):
+        a, b = inputs
+        return [(a * w).tanh() + b, (b * w).exp() * a]
+
+    w = Value(0.5)
+    a, b = Value(1.5), Value(-2.0)
+    expected_outputs = function([a, b])
+    ((expected_outputs[0] + 1) * expected_outputs[1]).backward()
+    expected_grads = [a.grad, b.grad, w.grad]
+    for value in (a, b, w):
+        value.grad = 0
+    # Act
+    with Tape() as tape:
+        outputs = checkpoint(function, [a, b], [w])
+        loss = (outputs[0] + 1) * outputs[1]
+    segment, = outputs[0]._children
+    tape.backward(loss) if use_tape else loss.backward()
+    # Assert
+    assert [out.data for out in outputs] == [out.data for out in expected_outputs]
+    assert segment._operator == 'checkpoint'
+    assert_grads_equal_expected([a, b, w], expected_grads)
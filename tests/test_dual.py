@@ -0,0 +1,159 @@
+import pytest
+import random
+import numpy as np
+
+from dlafs import Value, ValueArray, Dual, jvp
+from dlafs.nn.dnn import VanillaNN, Layer
+from dlafs.nn.rnn import RecurrentNN, RecurrentLayer
+
+
+def _function(x, y):
+    z = (x * y + x ** 2 - y / x).exp().log()
+    return (z.tanh() + z.sigmoid() + z.relu() - 3 * y) / (1 + x)
+
+
+@pytest.mark.parametrize('tangents', [(1, 0), (0, 1), (0.5, -2)])
+def test_jvp_matches_backward(tangents):
+    # Arrange
+    x, y = Value(1.5), Value(-0.7)
+    out = _function(x, y)
+    out.backward()
+    EXPECTED = x.grad * tangents[0] + y.grad * tangents[1]
+    # Act
+    output, tangent = jvp(_function, (1.5, -0.7), tangents)
+    # Assert
+    assert output.data == pytest.approx(out.data)
+    assert tangent == pytest.approx(EXPECTED)
+
+
+def test_dual_with_values():
+    # Arrange
+    a = Value(2.0)
+    x = Dual(3.0, tangent=1.0)
+    # Act
+    out = a * x + a - x / a + a ** x
+    # Assert
+    assert isinstance(out, Dual)
+    assert out.data == pytest.approx(2 * 3 + 2 - 1.5 + 8)
+    assert out.tangent == pytest.approx(2 - 0.5 + 8 * 0.6931471805599453)
+    assert out.requires_grad is False
+
+
+def test_dual_with_array():
+    # Arrange
+    x = Dual(3.0, tangent=1.0)
+    a = ValueArray([1.0, 2.0])
+    # Act
+    out = [x * a, x + a, x - a, x / a, x ** a]
+    # Assert
+    assert all(isinstance(o, ValueArray) and isinstance(o[1], Dual) for o in out)
+    assert [o[1].data for o in out] == pytest.approx([6, 5, 1, 1.5, 9])
+    assert [o[1].tangent for o in out] == pytest.approx([2, 1, 1, 0.5, 6])
+
+
+def test_dual_rpow():
+    # Arrange
+    x = Dual(3.0, tangent=1.0)
+    # Act
+    out = 2 ** x
+    # Assert
+    assert out.data == pytest.approx(8)
+    assert out.tangent == pytest.approx(8 * 0.6931471805599453)
+
+
+@pytest.mark.parametrize('model_type', ['dnn', 'dnn_matrix', 'rnn'])
+def test_jvp_with_model(model_type):
+    # Arrange
+    EPS = 1e-6
+    random.seed(42)
+    if model_type == 'dnn':
+        model = VanillaNN([Layer(3, 4, 'tanh'), Layer(4, 1, 'sigmoid')])
+        x = [0.2, -1.0, 0.5]
+        direction = [1.0, 0.5, -0.3]
+    elif model_type == 'dnn_matrix':
+        model = VanillaNN([Layer(3, 4, 'tanh', weight_matrix=True),
+                           Layer(4, 1, 'sigmoid', weight_matrix=True)])
+        x = [0.2, -1.0, 0.5]
+        direction = [1.0, 0.5, -0.3]
+    else:
+        model = RecurrentNN([RecurrentLayer(3, 4), Layer(4, 1, 'sigmoid')])
+        x = [[0.2, -1.0, 0.5], [0.1, 0.3, -0.4]]
+        direction = [[1.0, 0.5, -0.3], [0.0, -1.0, 0.2]]
+    x, direction = np.array(x), np.array(direction)
+    upper = ValueArray(model(ValueArray.from_numpy(x + EPS * direction))).to_numpy()
+    lower = ValueArray(model(ValueArray.from_numpy(x - EPS * direction))).to_numpy()
+    EXPECTED = (upper - lower) / (2 * EPS)
+    # Act
+    output, tangent = jvp(model, [x.tolist()], [direction.tolist()])
+    # Assert
+    assert ValueArray(output).to_numpy() == pytest.approx(upper, abs=1e-5)
+    assert np.ravel(tangent) == pytest.approx(np.ravel(EXPECTED), abs=1e-6)
+
+
+def test_dual_attention():
+    # Arrange
+    def attention(q, k0, k1):
+        return Value.attention(q, [k0, k1], [[1.0, -2.0], [0.5, 3.0]])[1]
+
+    primals = ([0.5, -1.0], [0.2, 0.4], [1.0, -0.3])
+    values = [[Value(x) for x in primal] for primal in primals]
+    attention(*values).backward()
+    EXPECTED = sum(x.grad for primal in values for x in primal)
+    # Act
+    output, tangent = jvp(attention, primals, ([1.0, 1.0], [1.0, 1.0], [1.0, 1.0]))
+    # Assert
+    assert isinstance(output, Dual)
+    assert tangent == pytest.approx(EXPECTED)
+
+
+@pytest.mark.parametrize('function', [
+    lambda x: Value.softmax(x)[1],
+    lambda x: Value.logsumexp(x),
+], ids=['softmax', 'logsumexp'])
+def test_dual_softmax(function):
+    # Arrange
+    primal, direction = [0.5, -1.0, 2.0], [1.0, 0.5, -2.0]
+    values = [Value(x) for x in primal]
+    function(values).backward()
+    EXPECTED = sum(x.grad * d for x, d in zip(values, direction))
+    # Act
+    output, tangent = jvp(function, [primal], [direction])
+    # Assert
+    assert isinstance(output, Dual)
+    assert tangent == pytest.approx(EXPECTED)
+
+
+def test_dual_matmul():
+    # Arrange
+    def product(a):
+        return (ValueArray(a) @ [[1.0, -2.0], [0.5, 3.0]]).sum()
+
+    primal, direction = [[0.5, -1.0], [2.0, 0.3]], [[1.0, 0.5], [-2.0, 0.0]]
+    a = ValueArray(primal)
+    product(a).backward()
+    EXPECTED = sum(v.grad * d for v, d in zip(a._elements(), sum(direction, [])))
+    # Act
+    output, tangent = jvp(product, [primal], [direction])
+    # Assert
+    assert isinstance(output, Dual)
+    assert tangent == pytest.approx(EXPECTED)
+
+
+@pytest.mark.parametrize('function', [
+    lambda x: (-x).exp().sum(),
+    lambda x: (x * x + 1).log().sum(),
+    lambda x: x.tanh().sum(),
+    lambda x: x.relu().sum(),
+    lambda x: x.sigmoid().sum(),
+], ids=['exp', 'log', 'tanh', 'relu', 'sigmoid'])
+def test_dual_array_elementwise(function):
+    # Arrange
+    primal, direction = [[0.5, -1.0], [2.0, 0.3]], [[1.0, 0.5], [-2.0, 1.0]]
+    a = ValueArray(primal)
+    function(a).backward()
+    EXPECTED = sum(v.grad * d for v, d in zip(a._elements(), sum(direction, [])))
+    # Act
+    output, tangent = jvp(lambda x: function(ValueArray(x)), [primal], [direction])
+    # Assert
+    assert isinstance(output, Dual)
+    assert tangent == pytest.approx(EXPECTED)
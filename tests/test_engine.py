@@ -0,0 +1,109 @@
+import pytest
+from .fixtures import *
+from .test_autograd import (
+    ADD_OTHER, ADD_SELF, SUB_OTHER, SUB_SELF, MUL_OTHER, MUL_SELF, DIV_OTHER, DIV_SELF,
+    POW_OTHER, POW_SELF, EXP, LOG, TANH, RELU, SIGMOID
+)
+
+import math
+import torch
+from dlafs.autograd import no_grad
+from dlafs.engine import Graph, Node
+
+
+@pytest.mark.parametrize(
+    ("values", "operations", "expected", "expected_grads"),
+    [
+        ADD_OTHER, ADD_SELF,
+        SUB_OTHER, SUB_SELF,
+        MUL_OTHER, MUL_SELF,
+        DIV_OTHER, DIV_SELF,
+        POW_OTHER, POW_SELF,
+        EXP, LOG, TANH, RELU, SIGMOID,
+    ],
+    ids=[
+        "add_other", "add_self",
+        "sub_other", "sub_self",
+        "mul_other", "mul_self",
+        "div_other", "div_self",
+        "pow_other", "pow_self",
+        "exp", "log", "tanh", "relu", "sigmoid",
+    ]
+)
+def test_node(values, operations, expected, expected_grads):
+    """Nodes should behave like the Value objects they mirror."""
+    # Arrange
+    with Graph():
+        values = [Node(v) for v in values]
+        # Act
+        actual = operations(*values)
+    actual.backward()
+    # Assert
+    assert math.isclose(actual.data, expected)
+    assert_grads_equal_expected(values, expected_grads)
+
+
+@pytest.mark.parametrize('activation', ['linear', 'tanh', 'relu', 'sigmoid'])
+def test_node_dot_vs_torch(activation):
+    # Arrange
+    weights, inputs, bias = [0.5, -1.2, 2.0], [1.5, 0.3, 0.25], 0.1
+    torch_activation = {'linear': lambda z: z, 'tanh': torch.tanh,
+                        'relu': torch.relu, 'sigmoid': torch.sigmoid}[activation]
+    tensors = [torch.tensor([v], requires_grad=True, dtype=torch.float64)
+               for v in weights + inputs + [bias]]
+    expected = torch_activation(sum(w * x for w, x in zip(tensors[:3], tensors[3:6])) + tensors[6])
+    expected.backward()
+    # Act
+    with Graph() as graph:
+        nodes = [Node(v) for v in weights + inputs + [bias]]
+        actual = Node.dot(nodes[:3], nodes[3:6], nodes[6], activation=activation)
+    actual.backward()
+    # Assert
+    assert len(graph) == 8
+    assert math.isclose(actual.data, expected.item())
+    assert_grads_equal_expected(nodes, tensors)
+
+
+def test_graph_storage():
+    # Arrange
+    with Graph() as graph:
+        x = Node(2, label='x')
+        y = Node(3, requires_grad=False)
+        # Act
+        z = x * y + 1
+        with no_grad():
+            w = z * x
+    z.backward()
+    # Assert
+    assert len(graph) == 6
+    assert list(graph.opcodes) == [0, 0, 2, 0, 1, 0]
+    assert list(graph.children) == [0, 1, 2, 3]
+    assert graph.labels == {0: 'x'}
+    assert graph.nbytes == 6 * (8 + 8 + 1 + 1 + 8) + 8 + 4 * 8
+    assert (x.grad, y.grad) == (3, 0)
+    assert w._operator == '' and not w.requires_grad
+
+
+def test_node_outside_graph():
+    # Arrange
+    with Graph() as graph:
+        x = Node(2)
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        Node(3)
+    y = x * 3  # Operations stay in the graph of their operands
+    assert y.graph is graph and len(graph) == 3
+
+
+def test_node_comparisons():
+    # Arrange
+    with Graph():
+        x, y = Node(2), Node(-1)
+        # Act
+        largest = max([x, y, x * y])
+    largest.backward()
+    # Assert
+    assert largest is x and x.grad == 1
+    assert y < x and x >= 2 and not x > 2 and y <= -1
+    with pytest.raises(TypeError):
+        Node.dot([1, 2], [3, 4])
@@ -0,0 +1,211 @@
+import pytest
+import os
+import random
+
+from dlafs import Value, ValueArray
+from dlafs.nn import Module, Layer, VanillaNN, RecurrentLayer, RecurrentNN, Conv1D, Flatten, \
+    MaxPool1D, AvgPool1D
+from dlafs.loss import mse, binary_cross_entropy
+from dlafs.train import Trainer
+from dlafs import jit
+from dlafs.jit import compile, generate_source
+
+
+def test_compile_vanilla_nn():
+    # Arrange
+    random.seed(42)
+    model = VanillaNN([
+        Layer(3, 4, activation='relu'),
+        Layer(4, 2, activation='sigmoid')
+    ])
+    compiled = compile(model, [1, 2, 3])
+    x = [-0.5, 0.25, 2]
+    # Act
+    actual = compiled(x)
+    # Assert
+    assert actual.to_list() == pytest.approx(model(x).to_list())
+    assert not actual.requires_grad
+
+
+def test_compile_recurrent_nn():
+    # Arrange
+    random.seed(42)
+    model = RecurrentNN([
+        RecurrentLayer(num_inputs=2, hidden_size=3),
+        Layer(3, 1, activation='linear')
+    ])
+    compiled = compile(model, [[0, 0], [0, 0], [0, 0]])
+    x = [[0.1, 0.2], [0.3, -0.5], [1, 2]]
+    # Act
+    actual = compiled(x)
+    # Assert
+    assert actual.to_list() == pytest.approx(model(x).to_list())
+    with pytest.raises(ValueError):
+        compiled([[0.1, 0.2]])
+
+
+@pytest.mark.parametrize('pool', [MaxPool1D, AvgPool1D])
+def test_compile_pooling(pool):
+    """Max pooling picks its inputs by their data, which a trace can't replay."""
+    # Arrange
+    random.seed(42)
+    model = VanillaNN([Conv1D(2, 3, kernel_size=2), pool(2), Flatten(), Layer(6, 1)])
+    example = [[0.1, 0.2], [0.3, -0.5], [1, 2], [0, 1], [-1, 0.5]]
+    x = [[1, -0.2], [0.5, 0.5], [-1, 2], [0.3, 0], [2, -0.5]]
+    # Act & Assert
+    if pool is MaxPool1D:
+        with pytest.raises(ValueError):
+            compile(model, example)
+    else:
+        assert compile(model, example)(x).data == pytest.approx(model(x).data)
+
+
+def test_compile_weight_matrix():
+    # Arrange
+    random.seed(42)
+    model = VanillaNN([Layer(2, 3, weight_matrix=True), Layer(3, 1)])
+    trainer = Trainer(model, mse, learning_rate=0.1)
+    # Act & Assert
+    with pytest.raises(ValueError, match='weight_matrix uses'):
+        compile(model, [0, 0])
+    with pytest.raises(ValueError, match='weight_matrix uses'):
+        trainer.train([[0, 0], [1, 1]], [[0], [1]], 1, silent=True, compiled=True)
+
+
+def test_compiled_step():
+    # Arrange
+    random.seed(42)
+    model = VanillaNN([
+        Layer(2, 3, activation='tanh'),
+        Layer(3, 1, activation='sigmoid')
+    ])
+    compiled = compile(model, [0, 0], loss=mse, example_target=[0])
+    x, y = [0.5, -1], [1]
+
+    expected_loss = mse(y, model(x))
+    expected_loss.backward()
+    expected_grads = [p.grad for p in model.parameters()]
+    model.zero_grad()
+    # Act
+    actual_loss = compiled.step(x, y)
+    # Assert
+    assert actual_loss == pytest.approx(expected_loss.data)
+    assert [p.grad for p in model.parameters()] == pytest.approx(expected_grads)
+
+
+@pytest.mark.parametrize('codegen', [False, True])
+def test_compiled_step_frozen(codegen, tmp_path, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(jit, 'CACHE_DIR', str(tmp_path))
+    random.seed(42)
+    model = VanillaNN([
+        Layer(2, 3, activation='tanh'),
+        Layer(3, 1, activation='sigmoid')
+    ])
+    for p in model.layers[0].parameters():
+        p.requires_grad = False
+    compiled = compile(model, [0, 0], loss=mse, example_target=[0], codegen=codegen)
+    x, y = [0.5, -1], [1]
+
+    mse(y, model(x)).backward()
+    expected_grads = [p.grad for p in model.parameters()]
+    model.zero_grad()
+    # Act
+    compiled.step(x, y)
+    # Assert
+    assert [p.grad for p in model.parameters()] == pytest.approx(expected_grads)
+    assert all(p.grad == 0 for p in model.layers[0].parameters())
+
+
+def test_train_compiled():
+    # Arrange
+    losses = []
+    for compiled in (False, True):
+        random.seed(42)
+        x = ValueArray.random_normal(shape=(5, 2), mean=0, std=1, label='x')
+        y = ValueArray([[int((x_i[0] + x_i[1]) > 0)] for x_i in x], label='y')
+        model = VanillaNN([
+            Layer(2, 4, activation='relu'),
+            Layer(4, 1, activation='sigmoid')
+        ])
+        trainer = Trainer(model, binary_cross_entropy, learning_rate=2e-1)
+        # Act
+        losses.append(trainer.train(x, y, 5, silent=True, compiled=compiled))
+    # Assert
+    assert losses[1] == pytest.approx(losses[0])
+
+
+def test_compiled_codegen(tmp_path, monkeypatch):
+    # Arrange
+    monkeypatch.setattr(jit, 'CACHE_DIR', str(tmp_path))
+    random.seed(42)
+    model = VanillaNN([
+        Layer(2, 3, activation='relu'),
+        Layer(3, 1, activation='sigmoid')
+    ])
+    compiled = compile(model, [0, 0], loss=mse, example_target=[0], codegen=True)
+    x, y = [0.5, -1], [1]
+
+    expected_loss = mse(y, model(x))
+    expected_loss.backward()
+    expected_grads = [p.grad for p in model.parameters()]
+    model.zero_grad()
+    # Act
+    actual_loss = compiled.step(x, y)
+    actual_output = compiled(x)
+    recompiled = compile(model, [1, 1], loss=mse, example_target=[1], codegen=True)
+    # Assert
+    assert actual_loss == pytest.approx(expected_loss.data)
+    assert [p.grad for p in model.parameters()] == pytest.approx(expected_grads)
+    assert actual_output.data == pytest.approx(model(x).data)
+    assert len(os.listdir(tmp_path)) == 1  # Same structure, so the cached code is reused
+    assert recompiled._functions['step'].__code__.co_filename in [
+        str(tmp_path / name) for name in os.listdir(tmp_path)
+    ]
+
+
+def test_generate_source():
+    # Arrange
+    random.seed(42)
+    model = Layer(2, 1, activation='tanh')
+    compiled = compile(model, [0, 0])
+    leaf_ids = compiled._input_ids + compiled._parameter_ids
+    # Act
+    source = generate_source(compiled.graph, leaf_ids, compiled._output_ids)
+    # Assert
+    assert source == (
+        'def forward(leaves):\n'
+        '    v0, v1, v2, v3, v4, = leaves\n'
+        '    v5 = math.tanh((v4 + v2 * v0 + v3 * v1))\n'
+        '    return [v5]\n'
+    )
+
+
+class _Expression(Module):
+
+    def __init__(self):
+        self.w = Value(2.0, label='w')
+
+    def __call__(self, x):
+        return (x[0] - self.w) / (x[0] - self.w) * x[1] + (1 - x[0]) * 1 + 0
+
+    def parameters(self):
+        return [self.w]
+
+
+def test_optimize_graph():
+    # Arrange
+    model = _Expression()
+    x = [3.0, 4.0]
+    # Act
+    compiled = compile(model, x, loss=mse, example_target=[0.5])
+    loss = compiled.step(x, [0.5])
+    # Assert
+    assert compiled.optimization_report == {
+        'constant_folding': 0, 'common_subexpressions': 9, 'divisions': 1,
+        'subtractions': 4, 'identities': 4, 'dead_nodes': 6,
+        'nodes_before': 32, 'nodes_after': 13,
+    }
+    assert compiled(x).data == pytest.approx(model(x).data)
+    assert loss == pytest.approx(mse([0.5], model(x)).data)
+    assert model.w.grad == pytest.approx(0)
@@ -0,0 +1,179 @@
+import pytest
+import random
+import numpy as np
+import torch
+
+from dlafs import Tensor, Value, ValueArray, no_grad
+from dlafs.nn import VanillaNN, Layer, Neuron
+from dlafs.loss import mse, binary_cross_entropy, multi_cross_entropy, cross_entropy
+from dlafs.train import Trainer
+
+A = [[0.5, -1.2, 2.0], [1.5, 0.3, -0.25]]
+B = [[0.7, 0.2, -1.0], [0.1, -0.4, 0.9]]
+
+
+@pytest.mark.parametrize('operations', [
+    lambda a, b: a + b,
+    lambda a, b: a - b * 2,
+    lambda a, b: a * b / (b ** 2 + 1),
+    lambda a, b: a @ b.T,
+    lambda a, b: (a.T @ b).sum(),
+    lambda a, b: a.exp() + (b * b + 0.5).log(),
+    lambda a, b: a.tanh() * b.relu() + a.sigmoid(),
+    lambda a, b: a.sum(axis=0) * b.mean(axis=1)[0] - a.mean(),
+    lambda a, b: a.reshape(2, 3, 1).mean(axis=(0, 1)) * b.sum(axis=(0, -1)),
+    lambda a, b: a[1] * b[:, 2].sum() + a.reshape(3, 2)[0, 1],
+    lambda a, b: a + b[0],
+    lambda a, b: a.reshape(2, 3, 1) @ b[:1],
+    lambda a, b: b[0] @ a.reshape(2, 3, 1) + a.reshape(2, 1, 3) @ b.T,
+])
+def test_tensor_vs_torch(operations):
+    # Arrange
+    torch_a, torch_b = (torch.tensor(x, requires_grad=True, dtype=torch.float64) for x in (A, B))
+    expected = operations(torch_a, torch_b)
+    expected.sum().backward()
+    a, b = Tensor(A), Tensor(B)
+    # Act
+    actual = operations(a, b)
+    actual.sum().backward()
+    # Assert
+    assert actual.to_numpy() == pytest.approx(expected.detach().numpy())
+    assert a.grad == pytest.approx(torch_a.grad.numpy())
+    assert b.grad == pytest.approx(torch_b.grad.numpy())
+
+
+def test_tensor_backward_freed_graph():
+    # Arrange
+    a = Tensor(A)
+    h = (a * 3).tanh()
+    (h * 2).sum().backward()
+    # Act & Assert
+    with pytest.raises(RuntimeError):
+        (h * 5).sum().backward()
+    with pytest.raises(RuntimeError):
+        h.backward()
+
+
+def test_tensor_constructors():
+    # Arrange
+    random.seed(42)
+    expected = ValueArray.random_normal((2, 3), mean=1, std=2).to_numpy()
+    random.seed(42)
+    # Act
+    tensor = Tensor.random_normal((2, 3), mean=1, std=2)
+    # Assert
+    assert tensor.to_numpy() == pytest.approx(expected)
+    assert Tensor.zeros((2, 3)).shape == (2, 3)
+    assert Tensor.random_uniform((4, ), low=-1, high=1).dim == 1
+    assert Tensor.from_numpy(np.ones((2, 2))).to_list() == [[1, 1], [1, 1]]
+
+
+def test_tensor_no_grad():
+    # Arrange
+    a = Tensor(A)
+    # Act
+    with no_grad():
+        b = (a * 2).exp()
+    c = a * Tensor(B, requires_grad=False)
+    # Assert
+    assert not b.requires_grad and not b._children
+    assert c.requires_grad and c._operator == '*'
+
+
+def test_tensor_from_values():
+    # Arrange
+    values = [[Value(1.0), Value(2.0)], [Value(3.0), Value(-1.0, requires_grad=False)]]
+    # Act
+    tensor = Tensor.from_values(values)
+    (tensor * Tensor([[1, 2], [3, 4]])).sum().backward()
+    # Assert
+    assert tensor.shape == (2, 2)
+    assert [v.grad for row in values for v in row] == [1, 2, 3, 0]
+
+
+@pytest.mark.parametrize('layer_sizes, loss', [
+    ([3, 4, 1], mse),
+    ([3, 4, 1], binary_cross_entropy),
+    ([3, 4, 3], multi_cross_entropy),
+    ([3, 4, 3], cross_entropy),
+])
+def test_tensor_model_matches_value_array(layer_sizes, loss):
+    """Running a batch as a Tensor should give the loss and gradients of the ValueArray path."""
+    # Arrange
+    random.seed(42)
+    model = VanillaNN([Layer(layer_sizes[0], layer_sizes[1], activation='tanh'),
+                       Layer(layer_sizes[1], layer_sizes[2], activation='sigmoid')])
+    x = ValueArray.random_uniform((5, 3), low=-1, high=1).to_list()
+    if layer_sizes[-1] == 1:
+        y = [0, 1, 1, 0, 1]
+    else:
+        y = [[1, 0, 0], [0, 1, 0], [0, 0, 1], [1, 0, 0], [0, 1, 0]]
+    expected = loss(y, [model(x_i) for x_i in x])
+    expected.backward()
+    expected_grads = [p.grad for p in model.parameters()]
+    model.zero_grad()
+    # Act
+    actual = loss(y, model(Tensor(x)))
+    actual.backward()
+    # Assert
+    assert actual.item() == pytest.approx(expected.data)
+    assert [p.grad for p in model.parameters()] == pytest.approx(expected_grads)
+
+
+def test_tensor_layer_batch_dims():
+    """A Layer should run over any leading dimensions of a Tensor."""
+    # Arrange
+    random.seed(42)
+    layer = Layer(3, 2, activation='tanh')
+    x = ValueArray.random_uniform((2, 2, 3), low=-1, high=1).to_list()
+    expected = [[layer(x_ij).to_list() for x_ij in x_i] for x_i in x]
+    # Act
+    actual = layer(Tensor(x))
+    actual.sum().backward()
+    # Assert
+    assert actual.to_numpy() == pytest.approx(np.array(expected))
+    assert all(p.grad != 0 for p in layer.parameters())
+
+
+def test_tensor_neuron():
+    # Arrange
+    random.seed(42)
+    neuron = Neuron(3, activation='relu')
+    x = [[0.5, -1.0, 2.0], [1.0, 1.0, 1.0]]
+    # Act
+    y = neuron(Tensor(x))
+    # Assert
+    assert y.to_list() == pytest.approx([neuron(x_i).data for x_i in x])
+
+
+def test_train_with_tensor():
+    # Arrange
+    random.seed(42)
+    x = ValueArray.random_uniform((20, 2), low=-1, high=1).to_list()
+    y = [x_i[0] * x_i[1] for x_i in x]
+    random.seed(0)
+    expected_model = VanillaNN([Layer(2, 4, activation='tanh'), Layer(4, 1, activation='linear')])
+    random.seed(0)
+    model = VanillaNN([Layer(2, 4, activation='tanh'), Layer(4, 1, activation='linear')])
+    expected = Trainer(expected_model, mse, learning_rate=1e-1).train(x, y, 10, silent=True)
+    # Act
+    loss = Trainer(model, mse, learning_rate=1e-1).train(Tensor(x), y, 10, silent=True)
+    # Assert
+    assert loss == pytest.approx(expected)
+
+
+def test_tensor_layer_weight_matrix():
+    # Arrange
+    random.seed(42)
+    layer = Layer(3, 2, activation='sigmoid', weight_matrix=True)
+    x = [[0.5, -1.0, 2.0], [1.0, 1.0, 1.0]]
+    expected = layer(x)
+    expected.sum().backward()
+    expected_grads = [p.grad for p in layer.parameters()]
+    layer.zero_grad()
+    # Act
+    actual = layer(Tensor(x))
+    actual.sum().backward()
+    # Assert
+    assert actual.to_numpy() == pytest.approx(expected.to_numpy())
+    assert [p.grad for p in layer.parameters()] == pytest.approx(expected_grads)